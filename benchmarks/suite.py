@@ -0,0 +1,209 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import product, repeat
+from financetools import Loan, LoanQueue, serialize
+from financetools.loan_queue import STRATEGIES
+
+#########################################
+#   Benchmark suite
+#   Times the Loan and LoanQueue hot paths over a grid of
+#   portfolio sizes, terms and budget slack
+#   python -m benchmarks.suite                     full grid, table
+#   python -m benchmarks.suite --quick             one point per axis
+#   python -m benchmarks.suite --json out.json     also write results
+#   python -m benchmarks.suite --compare out.json  exit 1 on regressions
+#########################################
+
+# Axis values, the first of each is the --quick grid
+AXES = {
+    'backend': ['decimal', 'cents'],
+    'loans': [4, 16, 64],
+    'term': [120, 360],
+    'slack': [0.25, 0.05, 1.0],
+    'strategy': STRATEGIES + ['optimal'],
+    'threads': [1, 2, 4, 8]
+}
+
+###############################
+#   FIXTURES
+###############################
+# Deterministic portfolio of n loans, budget = minimums * (1 + slack)
+def portfolio(loans, term, slack, backend=None, seed=0):
+    rng = random.Random(seed)
+    Q = [Loan(rng.randint(100000, 3000000) / 100, rng.randint(200, 900) / 100,
+              title=f'L{i}', term=rng.randint(term // 2, term), backend=backend)
+         for i in range(loans)]
+    budget = sum(l.min_payment for l in Q) * (1 + Loan.Dec(slack))
+    return LoanQueue(Q, budget, title='Bench', backend=backend)
+
+def mortgage(term, backend=None):
+    loan = Loan(245000, 6.1, title="Mortgage", term=term, backend=backend)
+    loan.payment_amt = loan.min_payment
+    return loan
+
+###############################
+#   CASES
+###############################
+# Each case takes its axis values and returns a zero-argument callable
+CASES = {}
+
+def case(*axes):
+    def register(fn):
+        CASES[fn.__name__] = (fn, axes)
+        return fn
+    return register
+
+@case('backend', 'term')
+def pay_month(backend, term):
+    loan = mortgage(term, backend)
+    return lambda: loan.branch().pay_months(term)
+
+@case('backend', 'term')
+def payoff(backend, term):
+    loan = mortgage(term, backend)
+    return lambda: loan.branch().payoff()
+
+@case('strategy', 'loans', 'term', 'slack')
+def debt_solve(strategy, loans, term, slack):
+    queue = portfolio(loans, term, slack)
+    return lambda: queue.debt_solve(strategy, 'int')
+
+@case('loans', 'term', 'slack')
+def finish(loans, term, slack):
+    queue = portfolio(loans, term, slack)
+    return lambda: queue.finish()
+
+@case('loans', 'term', 'slack')
+def finish_top(loans, term, slack):
+    queue = portfolio(loans, term, slack)
+    return lambda: queue.finish(lazy=True).top()
+
+@case('loans', 'term')
+def to_json(loans, term):
+    queue = portfolio(loans, term, AXES['slack'][0]).avalanche()
+    return lambda: queue.to_json()
+
+@case('loans', 'term')
+def iter_json(loans, term):
+    queue = portfolio(loans, term, AXES['slack'][0]).avalanche()
+    return lambda: ''.join(serialize.iter_json(queue))
+
+@case('loans', 'term')
+def binary(loans, term):
+    queue = portfolio(loans, term, AXES['slack'][0]).avalanche()
+    return lambda: serialize.loads(serialize.dumps(queue)).get_interest_paid()
+
+# Thread scaling: the same 20 solves of one shared queue spread over a
+# thread pool, faster with more threads only on free-threaded builds
+@case('threads', 'loans')
+def threads(threads, loans):
+    queue = portfolio(loans, AXES['term'][0], AXES['slack'][0])
+    keys = STRATEGIES * 4
+    def solve():
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(queue.debt_solve, keys, repeat('int')))
+    return solve
+
+@case('term')
+def histories(term):
+    loan = mortgage(term).solve_schedule()
+    def read():
+        loan.get_principal_history()
+        loan.get_interest_history()
+        loan.get_total_payment_history()
+        loan.get_p_to_i_over_time()
+    return read
+
+###############################
+#   RUNNER
+###############################
+def grid(quick=False):
+    for name, (fn, axes) in CASES.items():
+        values = [AXES[a][:1] if quick else AXES[a] for a in axes]
+        for point in product(*values):
+            params = dict(zip(axes, point))
+            label = ','.join(f'{k}={v}' for k, v in params.items())
+            yield f'{name}[{label}]', fn, params
+
+# Seconds per call: best and median of repeat runs, each long enough
+# (min_time) to swamp timer resolution
+def measure(fn, params, repeat=5, min_time=0.05):
+    call = fn(**params)
+    timer = timeit.Timer(call)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    times = sorted(t / number for t in timer.repeat(repeat=repeat, number=number))
+    return {
+        "min": times[0],
+        "median": times[len(times) // 2],
+        "number": number,
+        "repeat": repeat,
+        "params": params
+    }
+
+def run(quick=False, only=None, repeat=5, min_time=0.05, out=sys.stdout):
+    results = {}
+    for name, fn, params in grid(quick):
+        if only and not any(o in name for o in only):
+            continue
+        results[name] = measure(fn, params, repeat, min_time)
+        print(f'{name:<60} {results[name]["min"] * 1000:10.3f}ms', file=out)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "gil": getattr(sys, '_is_gil_enabled', lambda: True)(),
+            "date": datetime.now(timezone.utc).isoformat(timespec='seconds')
+        },
+        "results": results
+    }
+
+# Cases in both runs that got slower than baseline by more than threshold,
+# as {name: current / baseline}
+def compare(baseline, current, threshold=0.10):
+    regressions = {}
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["min"] / base["min"]
+        if ratio > 1 + threshold:
+            regressions[name] = ratio
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite')
+    parser.add_argument('--quick', action='store_true', help='first value of every axis only')
+    parser.add_argument('--only', action='append', help='run cases whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05, help='seconds per timing run')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='baseline results file to check against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown, 0.10 = 10%%')
+    args = parser.parse_args(argv)
+
+    current = run(args.quick, args.only, args.repeat, args.min_time)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(current, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        for name, ratio in sorted(regressions.items(), key=lambda r: -r[1]):
+            print(f'REGRESSION {name:<49} x{ratio:.2f}')
+        if regressions:
+            return 1
+        print(f'No regressions over {args.threshold:.0%} against {args.compare}')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
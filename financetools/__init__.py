@@ -1,3 +1,6 @@
 from .loan import Loan
 from .loan_queue import LoanQueue
 from .loan_queue_compare import LoanQueueCompare
+from .batch import PortfolioBatch
+from .cache import SolveCache
+from .spec import LoanSpec
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from .loan_queue_compare import LoanQueueCompare
+from .loan_queue import STRATEGIES
+from .strategies import get_strategy
+
+#########################################
+#   Asyncio solving
+#   debt_solve() and finish() for code running on an event loop
+#   On the loop, a solve hands control back every `yield_every` months,
+#   so other tasks keep running and cancellation lands within that
+#   many months; a timeout is checked at the same points
+#   With an executor, solves run in the pool instead and the worker
+#   stops itself at the timeout
+#   max_months stops solves that would never finish (a budget that
+#   only just covers interest can pay for centuries)
+#########################################
+
+# Months between chances for other tasks to run
+YIELD_EVERY = 12
+
+#   LoanQueue.debt_solve() as a coroutine
+#   timeout: seconds, raises asyncio.TimeoutError when exceeded
+#   max_months: raise ValueError for queues still paying after this long
+#   executor: run in this concurrent.futures executor instead of on
+#   the loop; cancelling only abandons a solve that has already started
+#   cache: a SolveCache to reuse (read-only) results from
+async def debt_solve(queue, key, minimum, yield_every=YIELD_EVERY, timeout=None, max_months=None,
+                     executor=None, cache=None):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    return await _debt_solve(queue, get_strategy(key), minimum, yield_every, deadline, max_months,
+                             executor, cache)
+
+#   LoanQueue.finish() as a coroutine, strategies solved concurrently
+#   (interleaved on the loop, or in parallel on executor); the timeout
+#   covers all of them, and if one fails the rest are cancelled
+async def finish(queue, goal='interest', minimum='int', yield_every=YIELD_EVERY, timeout=None,
+                 max_months=None, executor=None, cache=None, optimal=False):
+    keys = STRATEGIES + ['optimal'] if optimal else STRATEGIES
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    tasks = [asyncio.ensure_future(_debt_solve(queue, get_strategy(key), minimum, yield_every, deadline,
+                                               max_months, executor, cache)) for key in keys]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    all_complete = LoanQueueCompare(list(results))
+    all_complete.order_by(goal)
+    return all_complete
+
+async def _debt_solve(queue, strategy, minimum, yield_every, deadline, max_months, executor, cache):
+    loop = asyncio.get_running_loop()
+    if cache is not None:
+        digest = cache.digest(queue._solve_key(strategy.name, minimum))
+        found, result = queue._cache_get(cache, digest)
+        if found:
+            return result
+
+    if executor is None:
+        steps = _steps(queue, strategy, minimum, max_months)
+        while True:
+            try:
+                for _ in range(yield_every):
+                    next(steps)
+            except StopIteration as done:
+                result = done.value
+                break
+            if deadline is not None and loop.time() >= deadline:
+                raise asyncio.TimeoutError
+            await asyncio.sleep(0)
+    else:
+        timeout = None if deadline is None else max(deadline - loop.time(), 0)
+        solving = loop.run_in_executor(executor, _solve_within, queue.snapshot(), strategy, minimum,
+                                       yield_every, timeout, max_months)
+        result = await (solving if timeout is None else asyncio.wait_for(solving, timeout))
+
+    return queue._cache_put(cache, digest, result) if cache is not None else result
+
+# debt_solve() yielding after every month, returns the completed queue
+def _steps(queue, strategy, minimum, max_months):
+    months = queue._iter_solve(strategy, minimum)
+    next(months)
+    month = 0
+    while True:
+        try:
+            loans = next(months)
+        except StopIteration as done:
+            return done.value
+        month += 1
+        if month == max_months and not all(l.is_complete() for l in loans):
+            raise ValueError(f'Still paying after {max_months} months')
+        yield month
+
+# Worker side: the whole solve, checking the clock every check_every
+# months. Module level so executors can pickle it
+def _solve_within(queue, strategy, minimum, check_every, timeout, max_months):
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    steps = _steps(queue, strategy, minimum, max_months)
+    while True:
+        try:
+            for _ in range(check_every):
+                next(steps)
+        except StopIteration as done:
+            return done.value
+        if deadline is not None and time.monotonic() >= deadline:
+            raise asyncio.TimeoutError
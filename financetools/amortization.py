@@ -0,0 +1,182 @@
+from decimal import Decimal, ROUND_HALF_UP
+from math import ceil, inf, log, log1p
+from .ledger import CENT, Ledger, to_cents, from_cents
+
+#########################################
+#   Amortization
+#   Fast solvers for a single fixed-payment loan
+#   Closed-form: number of payments and interest from annuity formulas
+#   Schedules: whole payment history in one pass, either estimated
+#   from the closed form or replayed exactly in integer cents
+#########################################
+
+# Rates are quantized to hundredths of a percent, so one month of interest
+# on b cents at rate r (hundredths) is exactly b * r / RATE_DENOM cents
+RATE_DENOM = 120000
+HALF_DENOM = RATE_DENOM // 2
+
+###############################
+#   EXACT (INTEGER CENTS)
+###############################
+#   Loan.get_monthly_ir() for a rate in hundredths of a percent
+def monthly_ir(r: int):
+    return (from_cents(r) / 12) / 100
+
+#   Loan.Dec(loan.get_int_due()) in cents, the 'int' minimum payment
+def interest_due(b: int, r: int):
+    x = b * r
+    if x % RATE_DENOM == HALF_DENOM:
+        return to_cents((monthly_ir(r) * from_cents(b)).quantize(CENT, ROUND_HALF_UP))
+    return (x + HALF_DENOM) // RATE_DENOM
+
+#   One payment on balance b at rate r with payment pa, mirrors
+#   Loan.pay_month() and returns the (balance, principal, interest)
+#   row it would install
+def step(b: int, r: int, pa: int):
+    x = b * r
+    #   Interest lands exactly on half a cent, only here can Decimal's
+    #   28 digit rounding of the monthly rate change the result
+    if x % RATE_DENOM == HALF_DENOM:
+        return decimal_step(b, r, pa)
+    p = pa * RATE_DENOM - x
+    if p > b * RATE_DENOM:
+        p = b * RATE_DENOM
+    bal = b * RATE_DENOM - p
+    if p < 0:
+        x = pa * RATE_DENOM
+        p = 0
+    #   Everything is non-negative and off the half cent here,
+    #   so rounding half up is adding half and flooring
+    return ((bal + HALF_DENOM) // RATE_DENOM,
+            (p + HALF_DENOM) // RATE_DENOM,
+            (x + HALF_DENOM) // RATE_DENOM)
+
+#   Reference Decimal arithmetic, identical to Loan.pay_month()
+def decimal_step(b: int, r: int, pa: int):
+    bal = from_cents(b)
+    pmt = from_cents(pa)
+    int_payment = monthly_ir(r) * bal
+    principal_payment = pmt - int_payment
+    if principal_payment > bal:
+        principal_payment = bal
+    bal_fwd = bal - principal_payment
+    if principal_payment < 0:
+        int_payment = pmt
+        principal_payment = 0
+    return (to_cents(Decimal(bal_fwd).quantize(CENT, ROUND_HALF_UP)),
+            to_cents(Decimal(principal_payment).quantize(CENT, ROUND_HALF_UP)),
+            to_cents(Decimal(int_payment).quantize(CENT, ROUND_HALF_UP)))
+
+#   Replay payments until paid off (or limit payments made)
+#   Stops early if the balance stops moving, where payoff() would spin
+def amortize(b: int, r: int, pa: int, limit: int = None, capacity: int = 0):
+    ledger = Ledger(b, capacity)
+    append = ledger.append
+    n = 0
+    while b and n != limit:
+        row = step(b, r, pa)
+        append(*row)
+        n += 1
+        if row[0] == b and limit is None:
+            break
+        b = row[0]
+    return ledger
+
+#   Append up to `months` payments to a ledger, stopping at payoff
+#   Once the balance stops moving the rest of the run is one bulk repeat
+def replay(ledger, r: int, pa: int, months: int):
+    b = ledger.last_balance
+    while months and b:
+        row = step(b, r, pa)
+        if row[0] == b:
+            ledger.repeat(*row, months)
+            return
+        ledger.append(*row)
+        months -= 1
+        b = row[0]
+
+#   Exact number of payments until paid off, without recording them
+#   None if it takes more than limit payments or the balance never moves
+def payoff_months(b: int, r: int, pa: int, limit=inf):
+    n = 0
+    while b:
+        if n >= limit:
+            return None
+        nb = step(b, r, pa)[0]
+        if nb == b:
+            return None
+        b = nb
+        n += 1
+    return n
+
+#   Upper bound on how many months rounding can move the payoff date
+#   away from the closed form: half a cent per month, compounded,
+#   divided by the payment
+def drift_months(months: float, r: int, pa: int):
+    if months == inf or pa <= 0:
+        return inf
+    mir = r / RATE_DENOM
+    try:
+        drift = 0.5 * months if mir == 0 else 0.5 * ((1 + mir) ** months - 1) / mir
+    except OverflowError:
+        return inf
+    return 2 + drift / pa
+
+###############################
+#   CLOSED FORM (FLOAT)
+###############################
+#   Number of payments (fractional) to retire balance at monthly_rate
+#   n = -ln(1 - rB/P) / ln(1 + r)
+def periods(balance: float, monthly_rate: float, payment: float):
+    if payment <= balance * monthly_rate:
+        return inf
+    if monthly_rate == 0:
+        return balance / payment
+    return -log(1 - monthly_rate * balance / payment) / log1p(monthly_rate)
+
+#   Balance remaining after k payments
+#   B(1+r)^k - P((1+r)^k - 1)/r
+def balance_after(balance: float, monthly_rate: float, payment: float, k):
+    if monthly_rate == 0:
+        return balance - payment * k
+    g = (1 + monthly_rate) ** k
+    return balance * g - payment * (g - 1) / monthly_rate
+
+#   Level payment retiring balance in n payments, as Loan.min_payment
+#   P = rB / (1 - (1+r)^-n)
+def annuity_payment(balance: float, monthly_rate: float, n):
+    if monthly_rate == 0:
+        return balance / n
+    return balance * monthly_rate / (1 - (1 + monthly_rate) ** -n)
+
+#   Payment count, interest and total paid without stepping
+def closed_form(balance: float, monthly_rate: float, payment: float):
+    n = periods(balance, monthly_rate, payment)
+    if n == inf:
+        return {"num_payments": inf, "interest_paid": inf, "total_paid": inf}
+    num_p = max(ceil(n - 1e-9), 1)
+    final = balance_after(balance, monthly_rate, payment, num_p - 1) * (1 + monthly_rate)
+    total = payment * (num_p - 1) + final
+    return {
+        "num_payments": num_p,
+        "interest_paid": total - balance,
+        "total_paid": total
+    }
+
+#   Estimated schedule, every row computed independently from the
+#   closed form balance, rounded to cents (not reconciled with pay_month)
+def estimate(b: int, r: int, pa: int, capacity: int = 0):
+    balance, payment = b / 100, pa / 100
+    monthly_rate = r / RATE_DENOM
+    n = periods(balance, monthly_rate, payment)
+    if n == inf:
+        return Ledger(b, capacity)
+    num_p = max(ceil(n - 1e-9), 1)
+    bals = [round(max(balance_after(balance, monthly_rate, payment, k), 0) * 100)
+            for k in range(num_p + 1)]
+    bals[-1] = 0
+    ledger = Ledger(b, max(capacity, num_p))
+    for k in range(1, num_p + 1):
+        interest = round(bals[k - 1] * monthly_rate)
+        ledger.append(bals[k], bals[k - 1] - bals[k], interest)
+    return ledger
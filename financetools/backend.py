@@ -0,0 +1,86 @@
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+from .ledger import CENT, to_cents, from_cents
+from .amortization import step
+
+#########################################
+#   Numeric backends
+#   Decide how Loan.pay_month() does its arithmetic
+#   'decimal': Decimal math, optionally pinned to a fixed Context
+#   'cents':   integer cents, no Decimal objects in the hot path
+#   Both install exactly the same ledger rows
+#########################################
+
+class DecimalBackend:
+    name = 'decimal'
+
+    #   context=None uses the caller's current decimal context
+    def __init__(self, context=None):
+        self.context = context
+
+    def pay_month(self, loan):
+        if self.context is None:
+            return self._pay_month(loan)
+        with localcontext(self.context):
+            return self._pay_month(loan)
+
+    def _pay_month(self, loan):
+        current_bal = from_cents(loan.Payment_History.last_balance)
+        payment_amt = loan.payment_amt
+
+        #   Calculate interest due and subtract from principal payment
+        int_payment = loan._monthly_ir * current_bal
+        principal_payment = payment_amt - int_payment
+
+        #   If principal_payment is greater than balance,
+        if principal_payment > current_bal:
+            #   only pay current balance (never overpay)
+            principal_payment = current_bal
+
+        #   Calculate balance forward (capitalize or reduce)
+        bal_fwd = current_bal - principal_payment
+
+        #   If payment won't cover interest (negative principal_payment),
+        if principal_payment < 0:
+            #   entire payment goes to interest, no principal payment
+            int_payment = Decimal(payment_amt)
+            principal_payment = Decimal(0)
+
+        loan.Payment_History.append(
+            to_cents(bal_fwd.quantize(CENT, ROUND_HALF_UP)),
+            to_cents(principal_payment.quantize(CENT, ROUND_HALF_UP)),
+            to_cents(int_payment.quantize(CENT, ROUND_HALF_UP)))
+
+    def __reduce__(self):
+        if self.context is None:
+            return (get_backend, ('decimal',))
+        return (DecimalBackend, (self.context,))
+
+
+class CentsBackend:
+    name = 'cents'
+
+    #   Balance, rate and payment are already held as integers,
+    #   see amortization.step() for how rounding is kept identical
+    def pay_month(self, loan):
+        ledger = loan.Payment_History
+        ledger.append(*step(ledger.last_balance, loan._rate_units, loan._payment_cents))
+
+    def __reduce__(self):
+        return (get_backend, ('cents',))
+
+
+BACKENDS = {
+    'decimal': DecimalBackend(),
+    'cents': CentsBackend()
+}
+
+#   Accepts a backend name, instance, or None for the default
+def get_backend(backend=None):
+    if backend is None:
+        return BACKENDS['decimal']
+    if isinstance(backend, str):
+        try:
+            return BACKENDS[backend]
+        except KeyError:
+            raise ValueError(f'Unknown numeric backend "{backend}"') from None
+    return backend
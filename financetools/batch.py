@@ -0,0 +1,226 @@
+from array import array
+from itertools import repeat
+from .ledger import to_cents, from_cents
+from .amortization import step, interest_due, monthly_ir
+from .loan import Loan
+from .strategies import ORDER_EVERY, ORDER_ONCE, get_strategy
+
+#########################################
+#   Batch portfolio solver
+#   Runs debt_solve() for many portfolios at once
+#   Loans are held as flat integer-cent columns, offsets mark where
+#   each portfolio starts, and every portfolio is advanced month by
+#   month in lockstep without building Loan or LoanQueue objects
+#   Analyses match LoanQueue.get_analysis() exactly
+#########################################
+
+MINIMUMS = ('int', 'min', 'avg')
+
+class PortfolioBatch:
+    #   balances, rates, terms: one entry per loan
+    #   offsets: portfolio i owns loans offsets[i]:offsets[i+1]
+    #   budgets: one entry per portfolio
+    def __init__(self, balances, rates, terms, offsets, budgets):
+        self.balances = array('q', (to_cents(Loan.Dec(b)) for b in balances))
+        self.rates = array('q', (to_cents(Loan.Dec(r)) for r in rates))
+        self.terms = array('q', (int(t) if t else 12 for t in terms))
+        self.offsets = array('q', offsets)
+        self.budgets = array('q', (to_cents(Loan.Dec(b)) for b in budgets))
+        if len(self.offsets) != len(self.budgets) + 1 or self.offsets[-1] != len(self.balances):
+            raise ValueError("offsets must have one entry per portfolio plus the end")
+
+    # Build a batch from existing LoanQueues (current balances, queue budgets)
+    @classmethod
+    def from_queues(cls, queues):
+        balances, rates, terms, offsets = [], [], [], [0]
+        for queue in queues:
+            if queue.timeline is not None:
+                raise ValueError(f'{queue.title}: batch solves do not read event timelines')
+            for loan in queue.Q:
+                balances.append(loan.current_bal)
+                rates.append(loan.int_rate)
+                terms.append(loan.term)
+            offsets.append(len(balances))
+        return cls(balances, rates, terms, offsets, [q.budget for q in queues])
+
+    # Build a batch from LoanSpecs (see spec.py), their cents as they are
+    @classmethod
+    def from_specs(cls, specs, offsets, budgets):
+        batch = cls.__new__(cls)
+        batch.balances = array('q', (s.balance for s in specs))
+        batch.rates = array('q', (s.rate for s in specs))
+        batch.terms = array('q', (s.term for s in specs))
+        batch.offsets = array('q', offsets)
+        batch.budgets = array('q', (to_cents(Loan.Dec(b)) for b in budgets))
+        if len(batch.offsets) != len(batch.budgets) + 1 or batch.offsets[-1] != len(batch.balances):
+            raise ValueError("offsets must have one entry per portfolio plus the end")
+        return batch
+
+    @property
+    def size(self):
+        return len(self.budgets)
+
+    # Split into batches of at most n portfolios
+    def split(self, n):
+        parts = []
+        for start in range(0, self.size, n):
+            stop = min(start + n, self.size)
+            lo, hi = self.offsets[start], self.offsets[stop]
+            part = PortfolioBatch.__new__(PortfolioBatch)
+            part.balances = self.balances[lo:hi]
+            part.rates = self.rates[lo:hi]
+            part.terms = self.terms[lo:hi]
+            part.offsets = array('q', (o - lo for o in self.offsets[start:stop + 1]))
+            part.budgets = self.budgets[start:stop]
+            parts.append(part)
+        return parts
+
+    # Solve every portfolio with one strategy (name or Strategy), returns a list of
+    # get_analysis() dicts (None where debt_solve would raise,
+    # e.g. a budget that cannot cover the minimums)
+    # executor: spread chunks of portfolios over a concurrent.futures executor
+    # max_months: give up (None) on portfolios still paying after this many
+    # months, e.g. a remainder too small to move any balance
+    def solve(self, key, minimum='int', executor=None, chunksize=1000, max_months=None):
+        strategy = get_strategy(key)
+        if minimum not in MINIMUMS:
+            raise ValueError(f'Unknown minimum "{minimum}"')
+        if executor is None:
+            return _solve(self, strategy, minimum, max_months)
+        results = []
+        for part in executor.map(_solve, self.split(chunksize), repeat(strategy), repeat(minimum),
+                                 repeat(max_months)):
+            results.extend(part)
+        return results
+
+
+#################################
+#   LOCKSTEP ENGINE
+#################################
+# hook(month, active, rate, minp): called before each month with the
+# portfolios still paying, may change their loans' rates (and minimums)
+# and returns the portfolios it changed; those are re-ordered, as
+# debt_solve() re-runs prioritize() on a timeline rate change
+def _solve(batch, strategy, minimum, max_months=None, hook=None):
+    bal = list(batch.balances)
+    rate = list(batch.rates)
+    n = len(bal)
+    pay_no = [0] * n
+    principal = [0] * n
+    interest = [0] * n
+    minp = [0] * n if minimum == 'min' else None
+    # Minimum payments by (balance, rate, term): loans repeated across
+    # portfolios (e.g. sweep points) work theirs out once
+    minimums = {}
+    failed = [False] * batch.size
+
+    # Active loan order per portfolio, as debt_solve's temp queue
+    orders = []
+    for i in range(batch.size):
+        order = range(batch.offsets[i], batch.offsets[i + 1])
+        if minp is not None:
+            # e.g. a 0% loan has no minimum, only its portfolio fails
+            try:
+                for j in order:
+                    loan = (bal[j], rate[j], batch.terms[j])
+                    if loan not in minimums:
+                        minimums[loan] = _min_payment(*loan)
+                    minp[j] = minimums[loan]
+            except ArithmeticError:
+                failed[i] = True
+                orders.append([])
+                continue
+        if strategy.ordering is not None:
+            order = strategy.order(order, bal, rate)
+        orders.append([j for j in order if bal[j]])
+
+    # Advance all unfinished portfolios one month at a time
+    active = [i for i in range(batch.size) if orders[i]]
+    month = 0
+    while active:
+        if month == max_months:
+            for i in active:
+                failed[i] = True
+            break
+        month += 1
+        if hook is not None:
+            changed = hook(month, active, rate, minp)
+            if changed and strategy.ordering == ORDER_ONCE:
+                for i in changed:
+                    orders[i] = strategy.order(orders[i], bal, rate)
+        still_active = []
+        for i in active:
+            try:
+                order = _month(orders[i], batch.budgets[i], strategy, minimum,
+                               bal, rate, minp, pay_no, principal, interest)
+            except (ValueError, ArithmeticError):
+                failed[i] = True
+                continue
+            orders[i] = order
+            if order:
+                still_active.append(i)
+        active = still_active
+
+    results = []
+    for i in range(batch.size):
+        try:
+            results.append(None if failed[i] else _analysis(
+                range(batch.offsets[i], batch.offsets[i + 1]), pay_no, principal, interest))
+        except (ValueError, ArithmeticError):
+            results.append(None)
+    return results
+
+# One debt_solve month for one portfolio, returns loans still active
+def _month(order, budget, strategy, minimum, bal, rate, minp, pay_no, principal, interest):
+    if strategy.ordering == ORDER_EVERY:
+        order = strategy.order(order, bal, rate)
+
+    # set_all_payments(minimum)
+    if minimum == 'int':
+        pays = [interest_due(bal[j], rate[j]) for j in order]
+    elif minimum == 'min':
+        pays = [minp[j] for j in order]
+    else:
+        avg = (2 * budget + len(order)) // (2 * len(order))
+        pays = [avg] * len(order)
+    remainder = budget - sum(pays)
+    if remainder < 0:
+        raise ValueError("Budget cannot cover loan payments.")
+
+    # distribute(key, remainder)
+    pays = strategy.allocate(order, pays, remainder, bal, rate)
+
+    # Pay every loan, keep the ones with a balance
+    for j, pa in zip(order, pays):
+        bal[j], p, i = step(bal[j], rate[j], pa)
+        pay_no[j] += 1
+        principal[j] += p
+        interest[j] += i
+    return [j for j in order if bal[j]]
+
+# Loan.min_payment, quantized, for a fresh loan
+def _min_payment(b, r, term):
+    mir = monthly_ir(r)
+    discount_factor = (((1 + mir) ** term) - 1) / (mir * (1 + mir) ** term)
+    return to_cents(Loan.Dec(from_cents(b) / discount_factor))
+
+# LoanQueue.get_analysis() from per-loan totals
+def _analysis(loans, pay_no, principal, interest):
+    principal_paid = from_cents(sum(principal[j] for j in loans))
+    interest_paid = from_cents(sum(interest[j] for j in loans))
+    total_paid = principal_paid + interest_paid
+    p_to_i = []
+    for j in loans:
+        if not principal[j] + interest[j]:
+            p_to_i.append(0)
+        else:
+            p_to_i.append(Loan.Dec(from_cents(principal[j]) / from_cents(interest[j])))
+    return {
+        "duration": max(pay_no[j] for j in loans),
+        "num_payments": sum(pay_no[j] for j in loans),
+        "principal_paid": principal_paid,
+        "interest_paid": interest_paid,
+        "total_paid": total_paid,
+        'avg_pi': Loan.Dec(sum(p_to_i) / len(loans)),
+        "percent_principal": Loan.Dec(principal_paid / total_paid * 100)
+    }
@@ -0,0 +1,189 @@
+import hashlib
+import shelve
+import threading
+import time
+from collections import OrderedDict
+from .ledger import Ledger
+from .loan import Loan
+from .loan_queue import LoanQueue
+from . import instrument
+
+#########################################
+#   Solve cache
+#   Memoizes Loan.solve(), Loan.recursive_solve() and
+#   LoanQueue.debt_solve() on a canonical hash of the inputs' numbers
+#   (see Loan._key() / LoanQueue._solve_key()); titles aren't part of
+#   it, a hit is handed back under the caller's titles (retitle())
+#   Bounded LRU with an optional TTL, hit/miss/eviction counters and an
+#   optional on-disk store (shelve) that survives restarts
+#   Results are frozen when cached and the same object is handed to
+#   every caller, branch() one to keep paying it
+#########################################
+
+class SolveCache:
+    #   maxsize: entries kept in memory, least recently used go first
+    #   ttl: seconds an entry stays valid, None for no expiry
+    #   path: shelve file for the on-disk store, None for memory only
+    def __init__(self, maxsize: int = 1024, ttl: float = None, path: str = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._store = shelve.open(path) if path is not None else None
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.disk_hits = 0
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "disk_hits": self.disk_hits,
+                "size": len(self._entries)
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    #   Stable hex digest of a state tuple (ints, strings, tuples)
+    @staticmethod
+    def digest(key):
+        return hashlib.sha256(repr(key).encode()).hexdigest()
+
+    #   Cached result for key, or compute() it, freeze and cache it
+    def memoize(self, key, compute):
+        digest = self.digest(key)
+        found, value = self.get(digest)
+        if found:
+            return value
+        return self.put(digest, compute())
+
+    ###############################
+    #   ENTRIES
+    ###############################
+    #   (True, value) on a hit, (False, None) on a miss
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None and self._store is not None:
+                entry = self._store.get(digest)
+                if entry is not None and not self._expired(entry):
+                    self.disk_hits += 1
+                    self._remember(digest, entry)
+            if entry is None or self._expired(entry):
+                if entry is not None:
+                    self.expirations += 1
+                    self._forget(digest)
+                self.misses += 1
+                if instrument.ACTIVE is not None:
+                    instrument.ACTIVE.count('cache_misses')
+                return False, None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            if instrument.ACTIVE is not None:
+                instrument.ACTIVE.count('cache_hits')
+            return True, entry[1]
+
+    #   Freeze and cache value, returns the frozen value
+    #   If another thread cached the same key meanwhile, its value is kept
+    #   and returned, so every caller shares one result
+    def put(self, digest, value):
+        value = freeze(value)
+        entry = (time.time() + self.ttl if self.ttl is not None else None, value)
+        with self._lock:
+            current = self._entries.get(digest)
+            if current is not None and not self._expired(current):
+                self._entries.move_to_end(digest)
+                return current[1]
+            self._remember(digest, entry)
+            if self._store is not None:
+                self._store[digest] = entry
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._store is not None:
+                self._store.clear()
+
+    def close(self):
+        with self._lock:
+            if self._store is not None:
+                self._store.close()
+                self._store = None
+
+    def _expired(self, entry):
+        return entry[0] is not None and entry[0] <= time.time()
+
+    def _remember(self, digest, entry):
+        self._entries[digest] = entry
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _forget(self, digest):
+        self._entries.pop(digest, None)
+        if self._store is not None and digest in self._store:
+            del self._store[digest]
+
+
+###############################
+#   FROZEN RESULTS
+###############################
+def _read_only(self, *args, **kwargs):
+    raise TypeError("Cached results are read-only, branch() to change them")
+
+class FrozenLedger(Ledger):
+    append = repeat = defer = _read_only
+
+class FrozenLoan(Loan):
+    __setattr__ = __delattr__ = _read_only
+
+class FrozenQueue(LoanQueue):
+    __setattr__ = __delattr__ = _read_only
+    prioritize = add_loan = _read_only
+
+#   Make a solve result immutable in place, so it can be shared
+#   Queues hold their loans in a tuple, recursive_solve() lists
+#   become tuples
+def freeze(result):
+    if isinstance(result, (FrozenQueue, FrozenLoan)):
+        return result
+    if isinstance(result, LoanQueue):
+        result.Q = tuple(freeze(l) for l in result.Q)
+        result.__class__ = FrozenQueue
+    elif isinstance(result, Loan):
+        # Replay deferred payments now, reads can't write later
+        result.Payment_History.rows
+        result.Payment_History.__class__ = FrozenLedger
+        result.__class__ = FrozenLoan
+    elif isinstance(result, list):
+        result = tuple(result)
+    return result
+
+#   A frozen result under other titles: itself if they match, else a
+#   read-only view sharing its ledgers
+#   Loans: retitle(loan, title); queues: retitle(queue, title, titles)
+#   with titles the caller's loan titles in input order
+def retitle(result, title, titles=None):
+    if isinstance(result, FrozenLoan):
+        return result if result.title == title else _view(result, _title=title)
+    titles = tuple(titles)
+    if result._titles == titles and result.title == title:
+        return result
+    names = dict(zip(result._titles, titles))
+    return _view(result, _title=title, _titles=titles,
+                 Q=tuple(_view(l, _title=names[l.title]) for l in result.Q))
+
+def _view(frozen, **attrs):
+    view = frozen.__class__.__new__(frozen.__class__)
+    view.__dict__.update(frozen.__dict__)
+    view.__dict__.update(attrs)
+    return view
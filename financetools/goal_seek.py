@@ -0,0 +1,77 @@
+from math import ceil, floor
+from .ledger import from_cents
+from .amortization import RATE_DENOM, annuity_payment, interest_due, payoff_months
+from .batch import PortfolioBatch
+from .strategies import get_strategy
+
+#########################################
+#   Goal seek
+#   Inverse solves: the smallest budget that pays a LoanQueue off
+#   within a deadline, and the smallest payment that pays a Loan off
+#   within a term
+#   Annuity formulas give a bracket, which is checked (and widened if
+#   rounding put it off) by simulation, then bisected to the cent
+#   Every simulation stops as soon as it runs past the deadline
+#########################################
+
+# Smallest integer x with feasible(x), assuming anything above a
+# feasible x is feasible too. lo/hi are a guessed bracket, None if
+# nothing up to limit works
+def lowest_feasible(feasible, lo, hi, limit=2 ** 40):
+    lo = max(lo, 0)
+    hi = max(hi, lo + 1)
+    step = hi - lo
+    while not feasible(hi):
+        lo, hi = hi, hi + step
+        step *= 2
+        if hi > limit:
+            return None
+    while lo > 0 and feasible(lo):
+        hi, lo = lo, max(lo - step, 0)
+        step *= 2
+    if lo == 0 and feasible(0):
+        return 0
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if feasible(mid):
+            hi = mid
+        else:
+            lo = mid
+    return hi
+
+#   Smallest payment (Decimal) paying the loan off within months payments
+def payment_for_term(loan, months: int):
+    if months < 1:
+        raise ValueError("months must be at least 1")
+    loan._no_timeline('payment_for_term')
+    b, r = loan.Payment_History.last_balance, loan._rate_units
+    guess = annuity_payment(b, r / RATE_DENOM, months)
+    found = lowest_feasible(lambda pa: payoff_months(b, r, pa, months) is not None,
+                            floor(guess) - 1, ceil(guess) + 1)
+    return from_cents(found)
+
+#   Smallest budget (Decimal) for which debt_solve(key, minimum) pays
+#   the queue off within months, None if no budget does
+def min_budget(queue, months: int, key='avalanche', minimum='int'):
+    if months < 1:
+        raise ValueError("months must be at least 1")
+    strategy = get_strategy(key)
+    batch = PortfolioBatch.from_queues([queue])
+    balances, rates = batch.balances, batch.rates
+    if not balances:
+        return from_cents(0)
+
+    # Payments at the lowest rate are worth the most, so no budget below
+    # the annuity of the total balance at that rate can make it; paying
+    # every loan its own annuity usually does
+    lo = annuity_payment(sum(balances), min(rates) / RATE_DENOM, months)
+    hi = sum(annuity_payment(b, r / RATE_DENOM, months) for b, r in zip(balances, rates))
+    if minimum == 'int':
+        lo = max(lo, sum(interest_due(b, r) for b, r in zip(balances, rates)))
+
+    def feasible(budget):
+        batch.budgets[0] = budget
+        return batch.solve(strategy, minimum, max_months=months)[0] is not None
+
+    found = lowest_feasible(feasible, floor(lo) - 1, ceil(hi) + 1)
+    return from_cents(found) if found is not None else None
@@ -0,0 +1,176 @@
+import csv
+import json
+import mmap
+import os
+from collections import deque, namedtuple
+from .loan import Loan
+from .batch import MINIMUMS, PortfolioBatch, _solve
+from .loan_queue import LoanQueue
+from .serialize import iter_json
+from .spec import LoanSpec
+from .strategies import get_strategy
+from .sweep import DEFAULT_STRATEGIES, SweepTable
+
+#########################################
+#   Loan book ingestion
+#   Streams a loan book, one row per loan (portfolio id, balance, rate,
+#   term, budget, ...) as CSV or JSON lines, groups consecutive rows
+#   with the same portfolio id into portfolios of LoanSpecs, solves
+#   them in chunks with the batch engine and writes one result line
+#   per portfolio as it goes
+#   Memory stays bounded: rows are read lazily (optionally through a
+#   memory map), a chunk holds `chunksize` portfolios and at most
+#   `prefetch` chunks are in flight; the reader keeps filling the
+#   executor while earlier chunks are solved and written
+#   A portfolio's rows must be consecutive (a book sorted or grouped
+#   by portfolio id); an id seen again later starts a new portfolio
+#########################################
+
+# Row fields, read from the columns (CSV header / JSON keys) of the same
+# name unless mapped otherwise; portfolio, balance and rate are required
+FIELDS = ('portfolio', 'balance', 'rate', 'term', 'budget', 'title', 'payment')
+
+#   budget: the first one given in its rows, None for the sum of the
+#   loans' payments (as LoanQueue)
+Portfolio = namedtuple('Portfolio', ['id', 'loans', 'budget'])
+
+#   One line of output: the portfolio's best strategy for the goal and
+#   its get_analysis(), both None if no strategy can pay it off
+Result = namedtuple('Result', ['portfolio', 'strategy', 'analysis'])
+
+###############################
+#   READING
+###############################
+#   Rows of a loan book as dicts of FIELDS (None where missing or empty)
+#   format: 'csv' or 'jsonl', by default from the file extension
+#   columns: {field: column name} for books with other headings
+#   mapped: read through a memory map instead of buffered reads
+def read_rows(path, format=None, columns=None, mapped=False):
+    format = format or _format(path)
+    names = {f: f for f in FIELDS}
+    names.update(columns or {})
+    with open(path, 'rb') as f:
+        if mapped:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                yield from _rows(iter(m.readline, b''), format, names)
+        else:
+            yield from _rows(f, format, names)
+
+def _format(path):
+    suffix = str(path).rsplit('.', 1)[-1].lower()
+    if suffix == 'csv':
+        return 'csv'
+    if suffix in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    raise ValueError(f'Cannot tell the format of {path}, pass format="csv" or "jsonl"')
+
+def _rows(lines, format, names):
+    text = (line.decode() for line in lines)
+    if format == 'csv':
+        records = csv.DictReader(text)
+    elif format == 'jsonl':
+        records = (json.loads(line) for line in text if line.strip())
+    else:
+        raise ValueError(f'Unknown loan book format "{format}"')
+    for record in records:
+        row = {}
+        for field, name in names.items():
+            value = record.get(name)
+            row[field] = None if value == '' else value
+        yield row
+
+#   Portfolios of consecutive rows with the same portfolio id
+def group(rows):
+    current, loans, budget = None, [], None
+    for n, row in enumerate(rows):
+        if row['portfolio'] is None or row['balance'] is None or row['rate'] is None:
+            raise ValueError(f'Row {n + 1}: portfolio, balance and rate are required')
+        if loans and row['portfolio'] != current:
+            yield Portfolio(current, loans, budget)
+            loans, budget = [], None
+        current = row['portfolio']
+        loans.append(LoanSpec(row['balance'], row['rate'], row['payment'], title=row['title'], term=row['term']))
+        if budget is None and row['budget'] is not None:
+            budget = Loan.Dec(row['budget'])
+    if loans:
+        yield Portfolio(current, loans, budget)
+
+#   Portfolios as LoanQueues, one at a time
+def iter_queues(path, backend=None, **read):
+    for portfolio in group(read_rows(path, **read)):
+        yield LoanQueue(portfolio.loans, portfolio.budget, title=portfolio.id, backend=backend)
+
+
+###############################
+#   SOLVING
+###############################
+#   Result per portfolio, in book order
+#   goal: as finish(), the best of `strategies` is reported (ties go to
+#   the one listed first)
+#   executor: solve chunks on a concurrent.futures executor
+#   prefetch: chunks in flight at once, default twice the CPU count
+#   max_months: portfolios still paying after this long count as unpayable
+#   read: read_rows() arguments
+def iter_results(path, goal='interest', minimum='int', strategies=DEFAULT_STRATEGIES, executor=None,
+                 chunksize=1000, prefetch=None, max_months=1200, **read):
+    if goal not in SweepTable.GOALS:
+        raise ValueError(f'Unknown goal "{goal}"')
+    if minimum not in MINIMUMS:
+        raise ValueError(f'Unknown minimum "{minimum}"')
+    strategies = [get_strategy(s) for s in strategies]
+    chunks = _chunks(group(read_rows(path, **read)), chunksize)
+    if executor is None:
+        for chunk in chunks:
+            yield from _solve_chunk(chunk, strategies, minimum, goal, max_months)
+        return
+
+    if prefetch is None:
+        prefetch = 2 * (os.cpu_count() or 1)
+    pending = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(_solve_chunk, chunk, strategies, minimum, goal, max_months))
+        if len(pending) >= prefetch:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+#   Solve a book, writing one JSON line per portfolio to out
+#   Returns the number of portfolios written
+def ingest(path, out, **kwargs):
+    n = 0
+    for result in iter_results(path, **kwargs):
+        out.writelines(iter_json(result._asdict()))
+        out.write('\n')
+        n += 1
+    return n
+
+def _chunks(portfolios, size):
+    chunk = []
+    for portfolio in portfolios:
+        chunk.append(portfolio)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Every strategy over one chunk as a PortfolioBatch, the best result per
+# portfolio. Module level so executors can pickle it
+def _solve_chunk(chunk, strategies, minimum, goal, max_months):
+    specs, offsets, budgets = [], [0], []
+    for portfolio in chunk:
+        specs.extend(portfolio.loans)
+        offsets.append(len(specs))
+        budget = portfolio.budget
+        budgets.append(budget if budget is not None else sum(l.payment_amt for l in portfolio.loans))
+    batch = PortfolioBatch.from_specs(specs, offsets, budgets)
+
+    column = SweepTable.GOALS[goal]
+    best = [(None, None)] * len(chunk)
+    for strategy in strategies:
+        for i, analysis in enumerate(_solve(batch, strategy, minimum, max_months)):
+            if analysis is None:
+                continue
+            if best[i][1] is None or analysis[column] < best[i][1][column]:
+                best[i] = (strategy.name, analysis)
+    return [Result(p.id, name, analysis) for p, (name, analysis) in zip(chunk, best)]
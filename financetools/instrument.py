@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+#########################################
+#   Instrumentation
+#   Counters, timings and trace events from the solve hot paths
+#   (Loan.payoff(), recursive_solve(), LoanQueue.debt_solve(), finish(),
+#   the active loan scheduler and SolveCache)
+#   Off unless a Metrics is installed: every call site checks the one
+#   module global ACTIVE and does nothing more while it's None
+#   Process wide, so measure() concurrent work from one place; a
+#   Metrics can be updated from many threads at once
+#########################################
+
+# Installed Metrics, None while disabled
+ACTIVE = None
+
+class Metrics:
+    #   tracer: called as tracer(event, fields) for every event, e.g.
+    #   logging_tracer()
+    def __init__(self, tracer=None):
+        self.tracer = tracer
+        #   months:     debt_solve months simulated
+        #   segments:   event-driven debt_solve jumps
+        #   payments:   payments made by payoff()
+        #   sorts:      full sorts of a queue, reorders: single-loan moves
+        #   cache_hits, cache_misses: SolveCache lookups
+        #   and one count per event / timed section
+        self.counters = Counter()
+        #   Seconds per timed section: debt_solve.<strategy>, finish
+        self.timings = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def event(self, name, **fields):
+        with self._lock:
+            self.counters[name] += 1
+        if self.tracer is not None:
+            self.tracer(name, fields)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.timings[name] += elapsed
+                self.counters[name] += 1
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.timings.clear()
+
+    def to_json(self):
+        with self._lock:
+            return {"counters": dict(self.counters), "timings": dict(self.timings)}
+
+
+_OFF = nullcontext()
+
+#   Time a section into the installed metrics, if any
+def timer(name):
+    return ACTIVE.timer(name) if ACTIVE is not None else _OFF
+
+#   Install metrics (a new Metrics if None) for everything that follows
+def enable(metrics=None, tracer=None):
+    global ACTIVE
+    ACTIVE = metrics if metrics is not None else Metrics(tracer)
+    return ACTIVE
+
+#   Stop collecting, returns the metrics that were installed
+def disable():
+    global ACTIVE
+    metrics, ACTIVE = ACTIVE, None
+    return metrics
+
+#   Collect into a fresh Metrics for the duration of a with block
+#   with measure() as metrics:
+#       queue.finish()
+#   metrics.counters["months"]
+@contextmanager
+def measure(tracer=None):
+    global ACTIVE
+    previous, ACTIVE = ACTIVE, Metrics(tracer)
+    try:
+        yield ACTIVE
+    finally:
+        ACTIVE = previous
+
+#   Tracer sending events to a logger (default: "financetools")
+def logging_tracer(logger=None, level=logging.DEBUG):
+    logger = logger if logger is not None else logging.getLogger('financetools')
+    def trace(event, fields):
+        logger.log(level, '%s %s', event, fields)
+    return trace
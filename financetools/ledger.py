@@ -0,0 +1,357 @@
+import threading
+from array import array
+from collections import namedtuple
+from collections.abc import Mapping
+from decimal import Decimal
+
+#########################################
+#   Ledger
+#   Columnar record of a Loan's payments
+#   Stores balance, principal and interest as integer cents in
+#   preallocated arrays, pay_no is implied by row position
+#   Running (cumulative) principal and interest are kept as rows are
+#   appended, so totals are O(1) and histories O(n)
+#   Runs of fixed payments can be deferred and are only replayed into
+#   rows when something reads the ledger
+#   Reads back as Decimals, standing in for the old dict of lists
+#   A fork shares its parent's rows up to the fork point and only
+#   stores the rows written after it (rows are never rewritten, so
+#   the shared prefix can't change under either side)
+#########################################
+
+CENT = Decimal('0.01')
+
+# One schedule row as streamed by Loan.iter_schedule(), in Decimals
+Payment = namedtuple('Payment', ['title', 'pay_no', 'balance', 'principal', 'interest'])
+
+# Quantized Decimal (2 places) <-> integer cents
+def to_cents(d):
+    return int(d.scaleb(2))
+
+def from_cents(c):
+    return Decimal(c).scaleb(-2)
+
+# Stands in for the pending runs while they're replayed
+_REPLAYING = [None]
+
+
+class Ledger(Mapping):
+    COLUMNS = ('balance', 'principal', 'interest', 'pay_no')
+
+    #   Row 0 holds the starting balance, capacity is the number of
+    #   payments expected (usually the loan term)
+    def __init__(self, start_balance: int, capacity: int = 0):
+        size = max(int(capacity), 0) + 1
+        self._balance = array('q', bytes(8 * size))
+        self._principal = array('q', bytes(8 * size))
+        self._interest = array('q', bytes(8 * size))
+        self._cum_principal = array('q', bytes(8 * size))
+        self._cum_interest = array('q', bytes(8 * size))
+        self._balance[0] = start_balance
+        self._rows = 1
+        self._pending = []
+        self._pending_balance = None
+        #   Replays of deferred runs, one at a time: a ledger read from
+        #   several threads is settled once and nobody reads it half
+        #   replayed. Other ledgers replay alongside
+        self._lock = threading.RLock()
+        #   Forks: rows before _offset are read from _parent, local
+        #   row 0 is a copy of the parent's row at the fork point
+        self._parent = None
+        self._offset = 0
+
+    ###############################
+    #   MAPPING INTERFACE
+    ###############################
+    #   ledger['balance'] etc. return full columns, like the old dict
+
+    def __getitem__(self, key):
+        if key == 'pay_no':
+            return list(range(self.rows))
+        return [from_cents(c) for c in self.column(key)]
+
+    def __iter__(self):
+        return iter(self.COLUMNS)
+
+    def __len__(self):
+        return len(self.COLUMNS)
+
+    def to_json(self):
+        return {k: self[k] for k in self.COLUMNS}
+
+    ###############################
+    #   FAST ACCESSORS (cents)
+    ###############################
+    @property
+    def rows(self):
+        if self._pending:
+            self._settle()
+        return self._offset + self._rows
+
+    @property
+    def pay_no(self):
+        return self.rows - 1
+
+    @property
+    def last_balance(self):
+        if self._pending:
+            if self._pending_balance is not None:
+                return self._pending_balance
+            self._settle()
+        return self._balance[self._rows - 1]
+
+    #   Sum of a column so far, 'principal' or 'interest'
+    def total(self, key):
+        if self._pending:
+            self._settle()
+        return self._local_column(key, cumulative=True)[self._rows - 1]
+
+    #   Running total column, or a single row of it
+    def cumulative(self, key, row=None):
+        if self._pending:
+            self._settle()
+        col = self._local_column(key, cumulative=True)
+        if row is not None:
+            if row < 0:
+                row += self.rows
+            if not 0 <= row < self.rows:
+                raise IndexError(row)
+            # Shared rows are read from the parent
+            if row < self._offset:
+                return self._parent.cumulative(key, row)
+            return col[row - self._offset]
+        if self._parent is None:
+            return col[:self._rows]
+        return self._parent.cumulative(key)[:self._offset] + col[:self._rows]
+
+    #   Raw cents column, trimmed to the rows written
+    def column(self, key):
+        if self._pending:
+            self._settle()
+        if key == 'pay_no':
+            return array('q', range(self.rows))
+        col = self._local_column(key)
+        if self._parent is None:
+            return col[:self._rows]
+        return self._parent.column(key)[:self._offset] + col[:self._rows]
+
+    def _local_column(self, key, cumulative=False):
+        if key == 'principal':
+            return self._cum_principal if cumulative else self._principal
+        elif key == 'interest':
+            return self._cum_interest if cumulative else self._interest
+        elif key == 'balance' and not cumulative:
+            return self._balance
+        raise KeyError(key)
+
+    ###############################
+    #   FORKING
+    ###############################
+    #   New ledger continuing from row (default: the last one), sharing
+    #   every row up to it, capacity is room for the fork's own rows
+    def fork(self, row=None, capacity: int = 0):
+        if self._pending:
+            self._settle()
+        if row is None:
+            row = self.rows - 1
+        if not 0 <= row < self.rows:
+            raise IndexError(row)
+        # Share with whichever ancestor actually holds the row
+        if row < self._offset:
+            return self._parent.fork(row, capacity)
+        local = row - self._offset
+        child = Ledger(self._balance[local], capacity)
+        child._principal[0] = self._principal[local]
+        child._interest[0] = self._interest[local]
+        child._cum_principal[0] = self._cum_principal[local]
+        child._cum_interest[0] = self._cum_interest[local]
+        child._parent = self
+        child._offset = row
+        return child
+
+    #   Pickle only the rows written, not the spare capacity (nor the
+    #   lock, each copy gets its own)
+    def __getstate__(self):
+        if self._pending:
+            self._settle()
+        state = self.__dict__.copy()
+        del state['_lock']
+        for k, v in state.items():
+            if isinstance(v, array):
+                state[k] = v[:self._rows]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    ###############################
+    #   WRITING
+    ###############################
+    #   Record one payment, all values in cents
+    def append(self, b: int, p: int, i: int):
+        if self._pending:
+            self._settle()
+        n = self._rows
+        if n == len(self._balance):
+            self._grow()
+        self._balance[n] = b
+        self._principal[n] = p
+        self._interest[n] = i
+        self._cum_principal[n] = self._cum_principal[n - 1] + p
+        self._cum_interest[n] = self._cum_interest[n - 1] + i
+        self._rows = n + 1
+
+    #   Record the same payment k times
+    def repeat(self, b: int, p: int, i: int, k: int):
+        if self._pending:
+            self._settle()
+        n = self._rows
+        while n + k > len(self._balance):
+            self._grow()
+        cp = self._cum_principal[n - 1]
+        ci = self._cum_interest[n - 1]
+        self._balance[n:n + k] = array('q', [b]) * k
+        self._principal[n:n + k] = array('q', [p]) * k
+        self._interest[n:n + k] = array('q', [i]) * k
+        self._cum_principal[n:n + k] = array('q', range(cp + p, cp + p * k + 1, p)) if p else array('q', [cp]) * k
+        self._cum_interest[n:n + k] = array('q', range(ci + i, ci + i * k + 1, i)) if i else array('q', [ci]) * k
+        self._rows = n + k
+
+    #   Defer `months` payments of pa cents at rate r (hundredths)
+    #   Consecutive runs with the same terms are merged
+    #   balance: the balance after the run, if the caller already knows
+    #   it (e.g. a balance that doesn't move), so reading it won't replay
+    def defer(self, r: int, pa: int, months: int, balance: int = None):
+        if months <= 0:
+            return
+        if self._pending and self._pending_balance is None:
+            balance = None
+        if self._pending and self._pending[-1][:2] == (r, pa):
+            months += self._pending.pop()[2]
+        self._pending.append((r, pa, months))
+        self._pending_balance = balance
+
+    #   Replay deferred runs into rows
+    def _settle(self):
+        from .amortization import replay
+        with self._lock:
+            pending = self._pending
+            # Settled by another thread, or called back from replay()
+            if not pending or pending is _REPLAYING:
+                return
+            self._pending = _REPLAYING
+            self._pending_balance = None
+            try:
+                for r, pa, months in pending:
+                    replay(self, r, pa, months)
+            finally:
+                self._pending = []
+
+    #   Double capacity when payments outrun the term
+    def _grow(self):
+        pad = bytes(8 * len(self._balance))
+        self._balance.frombytes(pad)
+        self._principal.frombytes(pad)
+        self._interest.frombytes(pad)
+        self._cum_principal.frombytes(pad)
+        self._cum_interest.frombytes(pad)
+
+
+#########################################
+#   Running ledger
+#   Stand-in for Ledger when a schedule is streamed: keeps only the
+#   latest row and the running totals, so memory stays constant
+#   however many payments are made
+#########################################
+
+class RunningLedger:
+    def __init__(self, start_balance: int):
+        self.pay_no = 0
+        self.last_balance = start_balance
+        self._last = (start_balance, 0, 0)
+        self._totals = {'principal': 0, 'interest': 0}
+
+    @property
+    def rows(self):
+        return self.pay_no + 1
+
+    #   Latest row as a Payment
+    def row(self, title=None):
+        b, p, i = self._last
+        return Payment(title, self.pay_no, from_cents(b), from_cents(p), from_cents(i))
+
+    def total(self, key):
+        return self._totals[key]
+
+    #   Only the latest running total is kept
+    def cumulative(self, key, row=None):
+        if row is not None and row != self.pay_no:
+            raise IndexError("RunningLedger only keeps the latest row")
+        return self._totals[key]
+
+    def append(self, b: int, p: int, i: int):
+        self.pay_no += 1
+        self.last_balance = b
+        self._last = (b, p, i)
+        self._totals['principal'] += p
+        self._totals['interest'] += i
+
+    def repeat(self, b: int, p: int, i: int, k: int):
+        for _ in range(k):
+            self.append(b, p, i)
+
+
+#########################################
+#   Mapped ledger
+#   Ledger over columns that live in someone else's buffer (e.g. a
+#   memory-mapped results file, see serialize.py), read without copying
+#   The first write copies the rows into arrays and it carries on as
+#   an ordinary Ledger
+#########################################
+
+class MappedLedger(Ledger):
+    _COLUMNS = ('_balance', '_principal', '_interest', '_cum_principal', '_cum_interest')
+
+    #   columns: five 'q' memoryviews, in _COLUMNS order, rows long
+    def __init__(self, columns, rows: int):
+        for name, col in zip(self._COLUMNS, columns):
+            setattr(self, name, col)
+        self._rows = rows
+        self._pending = []
+        self._pending_balance = None
+        self._lock = threading.RLock()
+        self._parent = None
+        self._offset = 0
+
+    #   Reads hand out arrays, as Ledger does
+    def column(self, key):
+        return _to_array(Ledger.column(self, key))
+
+    def cumulative(self, key, row=None):
+        return _to_array(Ledger.cumulative(self, key, row))
+
+    def append(self, b: int, p: int, i: int):
+        self._materialize()
+        self.append(b, p, i)
+
+    def repeat(self, b: int, p: int, i: int, k: int):
+        self._materialize()
+        self.repeat(b, p, i, k)
+
+    #   Pickles (and copies) as a plain Ledger
+    def __reduce_ex__(self, protocol):
+        self._materialize()
+        return self.__reduce_ex__(protocol)
+
+    def _materialize(self):
+        for name in self._COLUMNS:
+            setattr(self, name, _to_array(getattr(self, name)[:self._rows]))
+        self.__class__ = Ledger
+
+def _to_array(col):
+    if not isinstance(col, memoryview):
+        return col
+    copy = array('q')
+    copy.frombytes(col.cast('B'))
+    return copy
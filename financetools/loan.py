@@ -1,4 +1,8 @@
+import threading
 from decimal import *
+from .ledger import CENT, Ledger, RunningLedger, to_cents, from_cents
+from .backend import get_backend
+from . import amortization, instrument
 
 #########################################
 #   Loan
@@ -7,13 +11,28 @@ from decimal import *
 #   Creates clones to modeling hypothetical payment scenarios
 #########################################
 
+# Guards the class counters, Loans are built on many threads at once
+_COUNTER_LOCK = threading.Lock()
+
 class Loan:
     #   Keep track of instances during runtime
     INSTANCE_COUNTER = 0
     UNTITLED_COUNTER = 0
 
-    def __init__(self, sb: float, ir: float, pa: float = None, title: str = None, term: float = None):
-        Loan.INSTANCE_COUNTER += 1
+    #   Timeline of lump sums, rate and payment changes read by payoff()
+    #   (see timeline.py), None for a fixed payment and rate
+    timeline = None
+    #   (pay_no, rate, payment) when the timeline's month 0 was, set by
+    #   the first solve through it; forks and branches read on from there
+    _timeline_start = None
+
+    def __init__(self, sb: float, ir: float, pa: float = None, title: str = None, term: float = None,
+                 backend=None):
+        with _COUNTER_LOCK:
+            Loan.INSTANCE_COUNTER += 1
+
+        #   Numeric backend used by pay_month(), 'decimal' or 'cents'
+        self.backend = get_backend(backend)
 
         #   Primary attributes
         self.title = title
@@ -23,12 +42,36 @@ class Loan:
         self.payment_amt = pa
 
         #   Main ledger object for reading/writing transactions
-        self.Payment_History = {
-            "balance": [self.start_balance],
-            "principal": [self.Dec(0)],
-            "interest": [self.Dec(0)],
-            "pay_no": [0]
-        }
+        #   Columnar integer cents, preallocated for term payments
+        self.Payment_History = Ledger(to_cents(self.start_balance), self.term)
+
+    #   Loan from a LoanSpec (see spec.py), its cents taken as they are
+    #   capacity: ledger rows to preallocate, default the term (0 grows
+    #   the ledger as payments are made, for loans built in bulk)
+    @classmethod
+    def from_spec(cls, spec, backend=None, capacity=None):
+        with _COUNTER_LOCK:
+            Loan.INSTANCE_COUNTER += 1
+        loan = cls.__new__(cls)
+        loan.backend = get_backend(backend)
+        loan.title = spec.title
+        loan._term = spec.term
+        loan._start_balance = from_cents(spec.balance)
+        loan._int_rate = from_cents(spec.rate)
+        loan._rate_units = spec.rate
+        loan._monthly_ir = (loan._int_rate / 12) / 100
+        loan._payment_amt = from_cents(spec.payment) if spec.payment is not None else None
+        loan._payment_cents = spec.payment or 0
+        loan.Payment_History = Ledger(spec.balance, spec.term if capacity is None else capacity)
+        return loan
+
+    #   Many Loans from columns (see spec.specs()), ledgers unallocated
+    #   until they're paid
+    @classmethod
+    def from_columns(cls, balances, rates, terms=None, payments=None, titles=None, backend=None):
+        from .spec import specs
+        backend = get_backend(backend)
+        return [cls.from_spec(s, backend, 0) for s in specs(balances, rates, terms, payments, titles)]
 
     ###############################
     #   GETTER / SETTERS
@@ -44,8 +87,10 @@ class Loan:
     @title.setter
     def title(self, t):
         if not t:
-            Loan.UNTITLED_COUNTER += 1
-            self._title = f"Untitled({Loan.UNTITLED_COUNTER})"
+            with _COUNTER_LOCK:
+                Loan.UNTITLED_COUNTER += 1
+                n = Loan.UNTITLED_COUNTER
+            self._title = f"Untitled({n})"
         else:
             self._title = t
 
@@ -75,6 +120,9 @@ class Loan:
     @int_rate.setter
     def int_rate(self, n):
         self._int_rate = self.Dec(n)
+        #   Cached for pay_month(): hundredths of a percent, monthly rate
+        self._rate_units = to_cents(self._int_rate)
+        self._monthly_ir = (self._int_rate / 12) / 100
 
     #   Payment amount
     @property
@@ -83,6 +131,7 @@ class Loan:
     @payment_amt.setter
     def payment_amt(self, n):
         self._payment_amt = self.Dec(n) if n is not None else n
+        self._payment_cents = to_cents(self._payment_amt) if n is not None else 0
 
     def to_json(self):
         return {
@@ -91,10 +140,20 @@ class Loan:
             "start_balance": self.start_balance,
             "int_rate": self.int_rate,
             "payment_amt": self.payment_amt,
-            "payment_history": self.Payment_History,
+            "payment_history": self.Payment_History.to_json(),
             "analysis": self.get_analysis()
         }
 
+    #   Everything a solve depends on, as plain values
+    def state(self):
+        return (self.title,) + self._key()
+
+    #   Solve cache key: the numbers only, so loans differing only in
+    #   title share results (re-titled on the way out, see cache.retitle)
+    def _key(self):
+        key = (to_cents(self.current_bal), self._rate_units, self._payment_cents, self.term)
+        return key if self.timeline is None else key + (self.timeline.state(), self._timeline_month())
+
     #######################
     #   GENERAL METHODS
     #######################
@@ -106,16 +165,16 @@ class Loan:
 
     #   Static rounding function
     #   Takes number obj, convert to Decimal if necessary, round to 2 places
+    #   (floats go through str() so 0.1 rounds like the literal 0.1)
     @staticmethod
     def Dec(n):
-        cent = Decimal('0.01')
         if not isinstance(n, Decimal):
-            n = Decimal(str(n))
-        return n.quantize(cent, ROUND_HALF_UP)
+            n = Decimal(n) if isinstance(n, int) else Decimal(str(n))
+        return n.quantize(CENT, ROUND_HALF_UP)
 
     #   Check if loan is paid off
     def is_complete(self):
-        return (self.current_bal == 0)
+        return (self.Payment_History.last_balance == 0)
 
     def get_payment_info(self):
         return [
@@ -149,58 +208,63 @@ class Loan:
 
     @property
     def current_bal(self):
-        return self.Payment_History['balance'][-1]
+        return from_cents(self.Payment_History.last_balance)
 
     @property
     def pay_no(self):
-        return self.Payment_History['pay_no'][-1]
+        return self.Payment_History.pay_no
 
     #   Methods perform calculations
 
     def get_monthly_ir(self):
-        return (self.int_rate / 12) / 100
+        return self._monthly_ir
 
     def get_int_due(self):
         return self.get_monthly_ir() * self.current_bal
 
+    #   Totals and histories read the ledger's running sums
     def get_interest_paid(self):
-        return sum(self.Payment_History['interest'])
+        return from_cents(self.Payment_History.total('interest'))
 
     def get_principal_paid(self):
-        return sum(self.Payment_History['principal'])
+        return from_cents(self.Payment_History.total('principal'))
 
     def get_total_paid(self):
-        return self.get_interest_paid() + self.get_principal_paid()
+        history = self.Payment_History
+        return from_cents(history.total('interest') + history.total('principal'))
 
     def get_p_to_i(self, c=None):
-        if not self.get_total_paid():
+        principal = self.get_principal_paid()
+        interest = self.get_interest_paid()
+        total = principal + interest
+        if not total:
             return 0
         if c is None:
-            return self.Dec(self.get_principal_paid() / self.get_interest_paid())
+            return self.Dec(principal / interest)
         elif c == 'p':
-            return self.Dec(self.get_principal_paid() / self.get_total_paid() * 100)
+            return self.Dec(principal / total * 100)
         elif c == 'i':
-            return self.Dec(self.get_interest_paid() / self.get_total_paid() * 100)
+            return self.Dec(interest / total * 100)
         
     def get_percent_principal(self):
         return Loan.Dec(self.get_principal_paid() / self.get_total_paid() * 100)
         
     def get_p_to_i_over_time(self):
-        history = self.Payment_History
+        principal = self.Payment_History["principal"]
+        interest = self.Payment_History["interest"]
         payments = self.pay_no
-        # highest_bal = float(max(history["balance"]))
-        return [(history["principal"][i+1] / (history["principal"][i+1]
-                + history["interest"][i+1]) * 100)
-                if history["principal"][i+1] != 0
+        return [(principal[i+1] / (principal[i+1]
+                + interest[i+1]) * 100)
+                if principal[i+1] != 0
                 else 0 for i in range(payments)]
     def get_principal_history(self):
-        return [sum(self.Payment_History["principal"][0:i+1]) for i in range(self.pay_no+1)]
+        return [from_cents(c) for c in self.Payment_History.cumulative('principal')]
     def get_interest_history(self):
-        return [sum(self.Payment_History["interest"][0:i+1]) for i in range(self.pay_no+1)]
+        return [from_cents(c) for c in self.Payment_History.cumulative('interest')]
     def get_total_payment_history(self):
-        principal_history = self.get_principal_history()
-        interest_history = self.get_interest_history()
-        return [principal_history[i] + interest_history[i] for i in range(self.pay_no+1)]
+        history = self.Payment_History
+        return [from_cents(p + i) for p, i in
+                zip(history.cumulative('principal'), history.cumulative('interest'))]
     
     def get_analysis(self):
         return {
@@ -218,33 +282,14 @@ class Loan:
     ###########################
     #   Records a new entry in Payment_History
     def install_payment(self, b, p, i):
-        self.Payment_History['balance'].append(self.Dec(b))
-        self.Payment_History['principal'].append(self.Dec(p))
-        self.Payment_History['interest'].append(self.Dec(i))
-        self.Payment_History['pay_no'].append(self.pay_no + 1)
+        self.Payment_History.append(
+            to_cents(self.Dec(b)), to_cents(self.Dec(p)), to_cents(self.Dec(i)))
 
     #   Make one Payment
+    #   Arithmetic is done by the numeric backend (see backend.py),
+    #   which installs the (balance, principal, interest) row
     def pay_month(self):
-        #   Calculate interest due and subtract from principal payment
-        int_payment = self.get_int_due()
-        principal_payment = self.payment_amt - int_payment
-
-        #   If principal_payment is greater than balance,
-        if principal_payment > self.current_bal:
-            #   only pay current balance (never overpay)
-            principal_payment = self.current_bal
-
-        #   Calculate balance forward (capitalize or reduce)
-        bal_fwd = self.current_bal - principal_payment
-
-        #   If payment won't cover interest (negative principal_payment),
-        if principal_payment < 0:
-            #   entire payment goes to interest, no principal payment
-            int_payment = self.payment_amt
-            principal_payment = 0
-
-        #   Install payment and return ref to self
-        self.install_payment(bal_fwd, principal_payment, int_payment)
+        self.backend.pay_month(self)
         return self
 
     #   Make m payments, checking for completion each iteration
@@ -257,12 +302,89 @@ class Loan:
 
     #   Make payments until repayment complete, return T or F based on completion
     def payoff(self):
+        if self.timeline is not None:
+            return self._payoff_timeline()
         if self.can_payoff():
+            start = self.pay_no
             while not self.is_complete():
                 self.pay_month()
-            print(f'payoff() call on "{self.title}" made {self.pay_no} calculations')
+            if instrument.ACTIVE is not None:
+                instrument.ACTIVE.count('payments', self.pay_no - start)
+                instrument.ACTIVE.event('payoff', title=self.title, payments=self.pay_no - start)
         return self
     
+    #   payoff() through the timeline's events: each month with events is
+    #   paid on its own, the quiet runs between them are deferred to the
+    #   ledger in one go. Stops when payments can't cover interest and no
+    #   event is left to change that
+    def _payoff_timeline(self):
+        history, month = self.Payment_History, self._start_timeline()
+        start = self.pay_no
+        while not self.is_complete():
+            month += 1
+            extra = self.timeline.apply_loan(self, month)
+            if extra:
+                self._pay_extra(extra)
+                continue
+            run = self.timeline.next_after(month) - month
+            if run == amortization.inf:
+                if not self.can_payoff():
+                    break
+                run = amortization.payoff_months(history.last_balance, self._rate_units, self._payment_cents)
+                if run is None:
+                    break
+            history.defer(self._rate_units, self._payment_cents, run)
+            month += run - 1
+        if instrument.ACTIVE is not None:
+            instrument.ACTIVE.count('payments', self.pay_no - start)
+            instrument.ACTIVE.event('payoff', title=self.title, payments=self.pay_no - start)
+        return self
+
+    #   Timeline months already paid, months count from the first
+    #   payment of the first solve through it
+    def _timeline_month(self):
+        return 0 if self._timeline_start is None else self.pay_no - self._timeline_start[0]
+
+    def _start_timeline(self):
+        if self._timeline_start is None:
+            self._timeline_start = (self.pay_no, self.int_rate, self.payment_amt)
+        return self._timeline_month()
+
+    #   One payment with a lump sum on top of payment_amt
+    def _pay_extra(self, extra):
+        payment = self.payment_amt
+        self.payment_amt = payment + extra
+        self.pay_month()
+        self.payment_amt = payment
+
+    #   Stream the payoff schedule of a branch one Payment row at a
+    #   time, starting with pay_no 0 (the current balance)
+    #   Only the latest row is kept, so memory doesn't grow with term
+    #   months: stop after this many payments instead of at payoff
+    #   A timeline is applied month by month, as _payoff_timeline()
+    def iter_schedule(self, months=None):
+        branch = self.branch()
+        history = branch.Payment_History = RunningLedger(to_cents(branch.current_bal))
+        timeline = branch.timeline
+        yield history.row(branch.title)
+        if months is None and timeline is None and not branch.can_payoff():
+            return
+        offset = 0 if timeline is None else branch._start_timeline() + 1
+        while not branch.is_complete() and history.pay_no != months:
+            extra = 0
+            if timeline is not None:
+                month = offset + history.pay_no
+                extra = timeline.apply_loan(branch, month)
+                # Stuck, and no event left to change that
+                if (months is None and not extra and not branch.can_payoff()
+                        and timeline.next_after(month) == amortization.inf):
+                    return
+            if extra:
+                branch._pay_extra(extra)
+            else:
+                branch.pay_month()
+            yield history.row(branch.title)
+
     #   Handle infinite loop (payments can't cover interest)
     def can_payoff(self):
         return self.payment_amt > self.get_int_due()
@@ -272,15 +394,94 @@ class Loan:
     ###############################################
 
     # Return a new Loan using self's state as init data
-    def branch(self):
-        return Loan(self.current_bal, self.int_rate, self.payment_amt, title=self.title, term=self.term)
+    def branch(self, backend=None):
+        branch = Loan(self.current_bal, self.int_rate, self.payment_amt, title=self.title, term=self.term,
+                      backend=backend if backend is not None else self.backend)
+        branch.timeline = self.timeline
+        if self._timeline_start is not None:
+            start, rate, payment = self._timeline_start
+            branch._timeline_start = (start - self.pay_no, rate, payment)
+        return branch
+
+    # Copy-on-write branch that keeps the payment history: shares every
+    # row up to pay_no `at` (default: now) with self, and only stores
+    # payments made after it. Analytics cover the full history
+    # A timeline picks up after month `at`, with the rate and payment
+    # its events had set by then
+    def fork(self, at=None, backend=None):
+        child = Loan.__new__(Loan)
+        child.__dict__.update(self.__dict__)
+        if backend is not None:
+            child.backend = get_backend(backend)
+        at = self.pay_no if at is None else at
+        child.Payment_History = self.Payment_History.fork(at, self.term - at)
+        if self.timeline is not None and self._timeline_start is not None:
+            start, child.int_rate, child.payment_amt = self._timeline_start
+            for month in sorted(set(self.timeline.months)):
+                if month > at - start:
+                    break
+                self.timeline.apply_loan(child, month)
+        return child
 
     # Call payoff() on a branch of self
     # Return paid branch loan obj
-    def solve(self):
+    # cache: a SolveCache to reuse (read-only) results from
+    def solve(self, cache=None):
+        if cache is not None:
+            from .cache import retitle
+            return retitle(cache.memoize(('solve',) + self._key(), self.solve), self.title)
         branch = self.branch()
         return branch.payoff()
 
+    ###############################################
+    #   CLOSED-FORM / SCHEDULE SOLVE METHODS
+    ###############################################
+    # No recursion and no per-month Decimal work,
+    # so 30-year terms cost about the same as short ones
+
+    # Number of payments and interest from the annuity formulas
+    def solve_closed_form(self):
+        self._no_timeline('solve_closed_form')
+        result = amortization.closed_form(
+            float(self.current_bal), float(self.get_monthly_ir()), float(self.payment_amt))
+        if result["num_payments"] == amortization.inf:
+            return result
+        result["interest_paid"] = self.Dec(result["interest_paid"])
+        result["total_paid"] = self.Dec(result["total_paid"])
+        return result
+
+    # Return a branch loan with its full schedule built in one pass
+    # exact=True replays pay_month() rounding in integer cents,
+    # exact=False fills rows straight from the closed form (estimate)
+    # A timeline is solved through payoff(), which defers the runs
+    # between events the same way
+    def solve_schedule(self, exact=True):
+        if self.timeline is not None:
+            if not exact:
+                self._no_timeline('solve_schedule(exact=False)')
+            return self.branch().payoff()
+        branch = self.branch()
+        b = to_cents(branch.current_bal)
+        r = to_cents(branch.int_rate)
+        pa = to_cents(branch.payment_amt)
+        if not branch.can_payoff():
+            return branch
+        if exact:
+            branch.Payment_History = amortization.amortize(b, r, pa, capacity=branch.term)
+        else:
+            branch.Payment_History = amortization.estimate(b, r, pa, capacity=branch.term)
+        return branch
+
+    # The annuity formulas assume one rate and payment throughout
+    def _no_timeline(self, method):
+        if self.timeline is not None:
+            raise ValueError(f'{self.title}: {method}() does not read event timelines, use solve()')
+
+    # Smallest payment that pays the loan off within months payments
+    def payment_for_term(self, months: int):
+        from .goal_seek import payment_for_term
+        return payment_for_term(self, months)
+
     ###############################################
     #   RECURSIVE DUPLICATIVE SOLVE METHODS
     ###############################################
@@ -303,12 +504,17 @@ class Loan:
     #   Recursive Pay Method
     #   Models an amortization schedule w/o altering object
     #   goal = number of payments to make
-    def recursive_solve(self, goal=None):
+    #   cache: a SolveCache, the result is then a tuple
+    def recursive_solve(self, goal=None, cache=None):
+        self._no_timeline('recursive_solve')
+        if cache is not None:
+            return cache.memoize(('recursive_solve', goal) + self._key(), lambda: self.recursive_solve(goal))
         #   Inner function performs recursive pay
         def inner(c_bal, i_c=0, num_p=0):
             #   End condition: Balance reaches 0, or num payments satisfied
             if c_bal == 0 or num_p == goal:
-                print(f'This solve() call on {self.title} made {num_p} calculations')
+                if instrument.ACTIVE is not None:
+                    instrument.ACTIVE.event('recursive_solve', title=self.title, payments=num_p)
                 # Also, should we consider any amount paid over s_bal to be int?
                 # All extra is, after all, just capitalized int
                 # so i_c += (principal_paid - s_bal)
@@ -331,7 +537,8 @@ class Loan:
 
         #   Don't execute if no goal is set and payments can't cover interest
         if (goal is None) and (_pa <= (_mir * s_bal)):
-            print("Minimum payment not met")
+            if instrument.ACTIVE is not None:
+                instrument.ACTIVE.event('minimum_not_met', title=self.title)
             return [s_bal, 0, 0]
 
         #   Otherwise, call recursive inner,
@@ -1,17 +1,107 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 from .loan import Loan
+from .ledger import RunningLedger, to_cents
 from .loan_queue_compare import LoanQueueCompare
+from .scheduler import ActiveLoans
+from .spec import LoanSpec
+from .strategies import ORDER_EVERY, get_strategy
+from . import amortization, instrument
 
 #########################################
 #   Queue of Loans
 #########################################
 
+# Strategies run by finish(), in LoanQueueCompare tie-break order
+STRATEGIES = ['avalanche', 'cascade', 'blizzard', 'ice_slide', 'snowball']
+
+# Module level so executors can pickle it
+def _debt_solve(queue, key, minimum):
+    return queue.debt_solve(key, minimum)
+
+# Shared pools for finish(parallel=...), started on first use
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+def _default_executor(kind='processes'):
+    with _POOLS_LOCK:
+        if kind not in _POOLS:
+            if kind == 'processes':
+                _POOLS[kind] = ProcessPoolExecutor(max_workers=len(STRATEGIES))
+            elif kind == 'threads':
+                _POOLS[kind] = ThreadPoolExecutor(max_workers=min(len(STRATEGIES), os.cpu_count() or 1))
+            else:
+                raise ValueError(f'Unknown pool "{kind}", use "processes" or "threads"')
+        return _POOLS[kind]
+
+# Months until the first loan(s) pay off at their current payments,
+# and those loans in queue order
+# Closed-form estimates rule most loans out, only loans that could be
+# first are stepped exactly. anchors remember each loan's balance when
+# its payment last changed, so deferred ledgers aren't replayed early
+# limit caps the jump, the result may then have no loans paid off
+def _next_payoff(loans, anchors, limit=amortization.inf):
+    estimates = []
+    for loan in loans:
+        r, pa = loan._rate_units, loan._payment_cents
+        anchor = anchors.get(loan)
+        if anchor is None or anchor[1] != pa:
+            anchor = anchors[loan] = [loan.Payment_History.last_balance, pa, 0]
+        n = amortization.periods(anchor[0] / 100, r / amortization.RATE_DENOM, pa / 100)
+        # Payment doesn't cover interest, balance can only grow
+        if n == amortization.inf:
+            continue
+        earliest = n - amortization.drift_months(n, r, pa) - anchor[2]
+        estimates.append((earliest, loan))
+
+    best, counts = limit, {}
+    for earliest, loan in sorted(estimates, key=lambda e: e[0]):
+        if earliest > best:
+            break
+        n = amortization.payoff_months(
+            loan.Payment_History.last_balance, loan._rate_units, loan._payment_cents, best)
+        if n is not None:
+            counts[loan] = n
+            best = min(best, n)
+
+    if best == amortization.inf:
+        raise ValueError("Budget cannot pay off loans.")
+    return best, [l for l in loans if counts.get(l) == best]
+
+
 class LoanQueue:
-    def __init__(self, loans: [Loan], budget: float=None, title=None):
+    # Timeline of lump sums, rate and budget changes read by debt_solve()
+    # (see timeline.py), None for fixed rates and budget
+    timeline = None
+
+    def __init__(self, loans: [Loan], budget: float=None, title=None, backend=None):
         
         # Primary attributes
         self.title = title
+        # LoanSpecs become Loans (on the queue's backend)
+        if any(isinstance(l, LoanSpec) for l in loans):
+            loans = [Loan.from_spec(l, backend) if isinstance(l, LoanSpec) else l for l in loans]
         self.Q = loans
         self.budget = budget
+        # Numeric backend for branched loans, None keeps each loan's own
+        self.backend = backend
+
+    # Many LoanQueues from columns in one pass, laid out like
+    # PortfolioBatch: loans offsets[i]:offsets[i+1] go to queue i
+    # budgets: one per queue (None entries for the sum of payments),
+    # or None for all; titles per loan, queue_titles per queue
+    @classmethod
+    def from_columns(cls, balances, rates, terms, offsets, budgets=None, payments=None, titles=None,
+                     queue_titles=None, backend=None):
+        if len(offsets) < 1 or offsets[-1] != len(balances):
+            raise ValueError("offsets must have one entry per portfolio plus the end")
+        loans = Loan.from_columns(balances, rates, terms, payments, titles, backend)
+        n = len(offsets) - 1
+        budgets = repeat(None, n) if budgets is None else budgets
+        queue_titles = repeat(None, n) if queue_titles is None else queue_titles
+        return [cls(loans[offsets[i]:offsets[i + 1]], b, title=t, backend=backend)
+                for i, b, t in zip(range(n), budgets, queue_titles)]
 
     ##################################
     #   PRIMARY GETTER / SETTERS
@@ -42,6 +132,39 @@ class LoanQueue:
     def to_json(self):
         return [loan.to_json() for loan in self.Q]
 
+    # Everything a solve depends on, as plain values
+    def state(self):
+        state = (self.title, to_cents(self.budget), tuple(l.state() for l in self.Q))
+        return state if self.timeline is None else state + (self.timeline.state(),)
+
+    # Solve cache key: the numbers only, so queues differing only in
+    # titles share results (re-titled on the way out, see _cache_get)
+    # Titles stay in when they can't be mapped back: repeated ones, or
+    # ones timeline events are aimed at
+    def _solve_key(self, strategy, minimum):
+        titles = [l.title for l in self.Q]
+        targeted = self.timeline is not None and any(getattr(e, 'loan', None) is not None for e in self.timeline)
+        if targeted or len(set(titles)) < len(titles):
+            return ('debt_solve', strategy, minimum) + self.state()
+        key = (to_cents(self.budget), tuple(l._key() for l in self.Q))
+        key = key if self.timeline is None else key + (self.timeline.state(),)
+        return ('debt_solve', strategy, minimum) + key
+
+    # Cached debt_solve() result for digest, titled as this queue
+    def _cache_get(self, cache, digest):
+        from .cache import retitle
+        found, result = cache.get(digest)
+        return found, (retitle(result, self.title, [l.title for l in self.Q]) if found else None)
+
+    # Cache this queue's debt_solve() result, returns the cached one
+    # titled as this queue
+    def _cache_put(self, cache, digest, result):
+        from .cache import retitle
+        titles = [l.title for l in self.Q]
+        # Input order, to map titles back for other queues
+        result._titles = tuple(titles)
+        return retitle(cache.put(digest, result), self.title, titles)
+
     ##################################
     #   EVALUATIVE METHODS
     ##################################
@@ -90,31 +213,43 @@ class LoanQueue:
                 self.add_loan(l)
         elif isinstance(new, Loan):
             self.Q.append(new)
+        elif isinstance(new, LoanSpec):
+            self.Q.append(Loan.from_spec(new, self.backend))
         else:
             raise TypeError
 
+    # History-free copy of the queue, cheap to pickle to worker processes
+    def snapshot(self):
+        return self.branch()
+
     # Return a LoanQueue of branch loans from instance
     def branch(self):
-        return LoanQueue([l.branch() for l in self.Q], self.budget, title=self.title)
-
-    # Order loans based on key (not neccessary for cascade or ice_slide)
+        branch = LoanQueue([l.branch(self.backend) for l in self.Q], self.budget, title=self.title,
+                           backend=self.backend)
+        branch.timeline = self.timeline
+        return branch
+
+    # Return a LoanQueue of forked loans (see Loan.fork), every loan as it
+    # stood at month `at` (or its payoff, if earlier), history shared
+    def fork(self, at=None):
+        fork = LoanQueue([l.fork(at if at is None else min(at, l.pay_no)) for l in self.Q], self._budget,
+                         title=self.title, backend=self.backend)
+        fork.timeline = self.timeline
+        return fork
+
+    # Order loans based on key, a strategy name (or Strategy) or 'balance'
+    # Unordered strategies (cascade, ice_slide) leave the queue as is
     def prioritize(self, key='balance'):
-        if key == 'avalanche':
-            # Sort by IR
-            self.Q.sort(key=lambda loan: (loan.int_rate, loan.current_bal))
-            return self
-        elif key == 'blizzard':
-            # Sorty by monthly interest cost
-            self.Q.sort(key=lambda loan: (loan.get_int_due()))
-            return self
-        elif key == 'snowball':
-            # Sort by descending balance
-            self.Q.sort(key=lambda loan: (loan.current_bal), reverse=True)
-            return self
-        elif key == 'balance':
+        if instrument.ACTIVE is not None:
+            instrument.ACTIVE.count('sorts')
+        if key == 'balance':
             # Sort by descending balance
             self.Q.sort(key=lambda loan: (loan.start_balance), reverse=True)
             return self
+        strategy = get_strategy(key)
+        if strategy.ordering is not None:
+            self.Q.sort(key=strategy.key, reverse=strategy.reverse)
+        return self
 
     # Set payment amounts in each loan based on key
     # Return remainder of budget after min satisfied
@@ -131,32 +266,16 @@ class LoanQueue:
 
         # Handle payments not covering minimum by raising error for now
         if b < 0:
-            print("Budget cannot cover loan payments.")
-            raise ValueError
+            raise ValueError("Budget cannot cover loan payments.")
         return b
 
+    # Hand remainder r out on top of the minimums, see strategies.py
     def distribute(self, key, r):
-        # Spread-style distribution
-        if key == 'cascade' or key == 'ice_slide':
-            self.spread(key, r)
-        # Target-style distribution
-        else:
-            self.Q[-1].payment_amt += r
+        get_strategy(key).distribute(self.Q, r)
 
+    # Spread-style distribution (cascade, ice_slide)
     def spread(self, key, r):
-        # Cascade spreads remainder proportional to impact on total IR
-        if key == 'cascade':
-            total = sum([l.int_rate for l in self.Q])
-            extra = [((l.int_rate / total) * r) for l in self.Q]
-
-        # Ice Slide spreads remainder proportional to impact on total MI
-        elif key == 'ice_slide':
-            total = sum([l.get_int_due() for l in self.Q])
-            extra = [((l.get_int_due() / total) * r) for l in self.Q]
-
-        # Distribute
-        for i in range(self.size):
-                self.Q[i].payment_amt += extra[i]
+        self.distribute(key, r)
 
     ############################################################
     #   ALGORITHM METHODS
@@ -201,58 +320,212 @@ class LoanQueue:
     def ice_slide(self, minimum='int'):
         return self.debt_solve('ice_slide', minimum)
     ############################################################
+    # OPTIMAL:      Interest-minimizing allocation rather than a
+    #               heuristic: highest rate first, spilling any
+    #               excess in a payoff month to the next highest.
+    #               Never pays more interest than avalanche.
+    def optimal(self, minimum='int'):
+        return self.debt_solve('optimal', minimum)
+    ############################################################
 
     # Do all methods, return LoanQueueCompare obj of Queues sorted by "best"
-    def finish(self, goal='interest', minimum='int'):
-        all_complete = LoanQueueCompare([
-            self.avalanche(minimum),
-            self.cascade(minimum),
-            self.blizzard(minimum),
-            self.ice_slide(minimum),
-            self.snowball(minimum)
-         ])
-        all_complete.order_by(goal)
-        return all_complete
+    # Strategies are independent, so they can run concurrently:
+    #   executor: any concurrent.futures executor to map them over
+    #   parallel: use a shared process pool (one worker per strategy), or
+    #   'threads' for a shared thread pool (see "Threads" in the README)
+    # cache: a SolveCache, only strategies it misses are solved
+    # optimal: also run the 'optimal' allocation, ranked after the heuristics on ties
+    # lazy: solve nothing up front, top() then races the strategies and
+    # stops each as soon as it can't win (see LoanQueueCompare.lazy)
+    def finish(self, goal='interest', minimum='int', executor=None, parallel=False, cache=None,
+               optimal=False, lazy=False):
+        keys = STRATEGIES + ['optimal'] if optimal else STRATEGIES
+        if lazy:
+            return LoanQueueCompare.lazy(self, keys, minimum, goal, cache)
+        with instrument.timer('finish'):
+            if executor is None and parallel:
+                executor = _default_executor('threads' if parallel == 'threads' else 'processes')
+            if executor is None:
+                results = [self.debt_solve(key, minimum, cache=cache) for key in keys]
+            elif cache is None:
+                results = list(executor.map(_debt_solve, repeat(self.snapshot()), keys, repeat(minimum)))
+            else:
+                digests = [cache.digest(self._solve_key(key, minimum)) for key in keys]
+                found = [self._cache_get(cache, d) for d in digests]
+                results = [value for _, value in found]
+                missing = [i for i, (hit, _) in enumerate(found) if not hit]
+                solved = executor.map(_debt_solve, repeat(self.snapshot()),
+                                      [keys[i] for i in missing], repeat(minimum))
+                for i, result in zip(missing, solved):
+                    results[i] = self._cache_put(cache, digests[i], result)
+            all_complete = LoanQueueCompare(results)
+            all_complete.order_by(goal)
+            return all_complete
+
+    # finish() and debt_solve() for asyncio code: they hand the event loop
+    # back every yield_every months, can be cancelled, take a timeout and
+    # a max_months limit, or run on an executor, see aio.py
+    async def async_finish(self, goal='interest', minimum='int', **kwargs):
+        from .aio import finish
+        return await finish(self, goal, minimum, **kwargs)
+
+    async def async_debt_solve(self, key, minimum, **kwargs):
+        from .aio import debt_solve
+        return await debt_solve(self, key, minimum, **kwargs)
+
+    # Solve over a grid of budgets (and rate shocks) for every strategy,
+    # returns a SweepTable, see sweep.py for the options
+    def sweep(self, budgets, rate_shocks=(0,), **kwargs):
+        from .sweep import sweep
+        return sweep(self, budgets, rate_shocks, **kwargs)
+
+    # Smallest budget with which debt_solve(key, minimum) pays every loan
+    # off within months, None if no budget does
+    def min_budget(self, months: int, key='avalanche', minimum='int'):
+        from .goal_seek import min_budget
+        return min_budget(self, months, key, minimum)
+
+    # Monte Carlo over random rate paths for the variable-rate loans, see
+    # montecarlo.simulate()
+    def simulate(self, model, paths=1000, **kwargs):
+        from .montecarlo import simulate
+        return simulate(self, model, paths, **kwargs)
 
     # Main algo driver, solve-in-place, returns completed LoanQueue
-    def debt_solve(self, key, minimum):
-        # Method logic map
-        order_once = (key == "avalanche" or key == "snowball")
-        order_every = (key == "blizzard")
-
+    # key: strategy name or Strategy instance (see strategies.py)
+    # event_driven: jump from one payoff to the next where the strategy
+    # allows it (Strategy.static), identical results
+    # cache: a SolveCache to reuse (read-only) results from
+    def debt_solve(self, key, minimum, event_driven=False, cache=None):
+        strategy = get_strategy(key)
+        if cache is not None:
+            digest = cache.digest(self._solve_key(strategy.name, minimum))
+            found, result = self._cache_get(cache, digest)
+            if found:
+                return result
+            return self._cache_put(cache, digest, self.debt_solve(strategy, minimum, event_driven))
+        with instrument.timer(f'debt_solve.{strategy.name}'):
+            if event_driven and strategy.static(minimum):
+                return self._event_solve(strategy, minimum)
+
+            months = self._iter_solve(strategy, minimum)
+            while True:
+                try:
+                    next(months)
+                except StopIteration as done:
+                    return done.value
+
+    # Stream a debt_solve month by month as Payment rows, every active
+    # loan's row for month 0 (starting balances), 1, 2, ...
+    # Ledgers only keep their latest row, memory doesn't grow with duration
+    def iter_months(self, key, minimum='int'):
+        for loans in self._iter_solve(get_strategy(key), minimum, retain=False):
+            for loan in loans:
+                yield loan.Payment_History.row(loan.title)
+
+    # debt_solve() as a generator: yields the active loans (queue order)
+    # before the first month and after each one, returns the completed queue
+    # retain=False swaps in RunningLedgers for streaming
+    def _iter_solve(self, strategy, minimum, retain=True):
         # 1) Create tempQ(branch), completedQ(empty) structures
         temp_queue = self.branch()
-        completed_queue = LoanQueue([], self.budget, title=self.title)
+        completed_queue = LoanQueue([], self.budget, title=self.title, backend=self.backend)
+        if not retain:
+            for loan in temp_queue.Q:
+                loan.Payment_History = RunningLedger(to_cents(loan.current_bal))
 
-        # Initial ordering
-        if order_once:
-            temp_queue.prioritize(key)
+        # Initial ordering, ORDER_EVERY is then kept up to date by the scheduler
+        temp_queue.prioritize(strategy)
+        active = ActiveLoans(temp_queue.Q, strategy.key if strategy.ordering == ORDER_EVERY else None)
+        yield temp_queue.Q
 
         # 4) Execute method until all loans popped from temp->completed
-        while temp_queue.size > 0:
-            # 3) Step through payments until at least one reaches 0
-            while all([not l.is_complete() for l in temp_queue.Q]):
-
-                if order_every:
-                    temp_queue.prioritize(key)
-
-                # Set minimums, remainder is budget leftover (raises error if<0)
-                remainder = temp_queue.set_all_payments(minimum)
+        paid_off = [l for l in temp_queue.Q if l.is_complete()]
+        timeline, month = self.timeline, 0
+        while True:
+            # "Pop" paidoff loan(s) to completed queue
+            for l in paid_off:
+                completed_queue.add_loan(l)
+            active.retire(paid_off)
+            if temp_queue.size == 0:
+                break
+
+            # This month's events, a rate change re-runs the ordering
+            month += 1
+            extra, targeted = 0, ()
+            if timeline is not None:
+                extra, targeted, rates = timeline.apply_queue(temp_queue, month)
+                if rates:
+                    temp_queue.prioritize(strategy)
+                    active.resync()
+
+            # Set minimums, remainder is budget leftover (raises error if<0)
+            remainder = temp_queue.set_all_payments(minimum) + extra
+
+            # Distribute remainder, lump sums for a loan go on top
+            strategy.distribute(temp_queue.Q, remainder)
+            for loan, amount in targeted:
+                loan.payment_amt += amount
+
+            # 3) Make one payment for each loan in temp, note any paid off
+            paid_off = active.pay_month()
+            if instrument.ACTIVE is not None:
+                instrument.ACTIVE.count('months')
+            yield temp_queue.Q
 
-                # Distribute remainder
-                temp_queue.distribute(key, remainder)
+        # After every Loan completes, reorder and return completed Queue
+        return completed_queue.prioritize()
 
-                # Make one payment for each loan in temp
-                for loan in temp_queue.Q:
-                    loan.pay_month()
+    # Event-driven debt_solve
+    # Payments are set once per segment, then every loan defers that many
+    # months of fixed payments to its ledger (replayed when read) and the
+    # queue jumps straight to the month the next loan(s) pay off
+    def _event_solve(self, strategy, minimum):
+        temp_queue = self.branch()
+        completed_queue = LoanQueue([], self.budget, title=self.title, backend=self.backend)
+        temp_queue.prioritize(strategy)
 
-            # "Pop" paidoff loan(s) to completed queue
-            paid_off = [l for l in temp_queue.Q if l.is_complete()]
+        anchors = {}
+        paid_off = [l for l in temp_queue.Q if l.is_complete()]
+        timeline, month = self.timeline, 0
+        while True:
             for l in paid_off:
                 completed_queue.add_loan(l)
                 temp_queue.Q.remove(l)
+            if temp_queue.size == 0:
+                break
+            # Segments also end at timeline events; a lump sum month is a
+            # segment of its own
+            extra, targeted, stop = 0, (), amortization.inf
+            if timeline is not None:
+                extra, targeted, rates = timeline.apply_queue(temp_queue, month + 1)
+                if rates:
+                    temp_queue.prioritize(strategy)
+                    anchors.clear()
+                stop = 1 if extra or targeted else timeline.next_after(month + 1) - month - 1
+            remainder = temp_queue.set_all_payments(minimum) + extra
+            strategy.distribute(temp_queue.Q, remainder)
+            for loan, amount in targeted:
+                loan.payment_amt += amount
+            # Paying exactly the interest due leaves a balance unchanged,
+            # except when the interest falls on a half cent and rounding
+            # moves it; then the minimums (and target) change next month
+            limit, still = stop, {}
+            if minimum == 'int':
+                for loan in temp_queue.Q[:-1]:
+                    b = loan.Payment_History.last_balance
+                    if amortization.step(b, loan._rate_units, loan._payment_cents)[0] != b:
+                        limit = 1
+                        break
+                    still[loan] = b
+            months, paid_off = _next_payoff(temp_queue.Q, anchors, limit)
+            month += months
+            if instrument.ACTIVE is not None:
+                instrument.ACTIVE.count('segments')
+            for loan in temp_queue.Q:
+                loan.Payment_History.defer(loan._rate_units, loan._payment_cents, months, still.get(loan))
+                anchors[loan][2] += months
 
-        # After every Loan completes, reorder and return completed Queue
         return completed_queue.prioritize()
     
     # Solve-in-place every loan in the queue
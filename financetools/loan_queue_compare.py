@@ -1,16 +1,86 @@
+import heapq
+from math import floor, log, log1p
+from .amortization import RATE_DENOM
+from .ledger import to_cents
+from .strategies import get_strategy
+from . import instrument
+
 ######################################################
 #   Compare LoanQueues
 ######################################################
 
+# How far each goal has got over a queue's loans so far (cents for
+# interest), never decreases as months are paid
+PROGRESS = {
+  'interest': lambda loans: sum(l.Payment_History.total('interest') for l in loans),
+  'time': lambda loans: max([l.pay_no for l in loans], default=0),
+  'num_p': lambda loans: sum(l.pay_no for l in loans)
+}
+
+# Lower bound (cents) on the interest loans will have paid by the end of
+# a debt_solve paying 'int' minimums with budget (cents)
+# Every month costs at least the lowest rate on the whole balance and
+# pays at most the budget, so the balance can't fall faster than one
+# loan at that rate would, and that loan's interest until it's paid off
+# is a floor; widened by half a cent per loan a month for rounding
+def _interest_bound(loans, budget):
+  paid = PROGRESS['interest'](loans)
+  active = [l for l in loans if not l.is_complete()]
+  rate = min([l._rate_units for l in active], default=0) / RATE_DENOM
+  if not rate:
+    return paid
+  b = budget + len(active)
+  remaining = sum(l.Payment_History.last_balance for l in active)
+  c = b / rate
+  months = 1200 if c <= remaining else min(floor(log(c / (c - remaining)) / log1p(rate)), 1200)
+  future = months * b + (remaining - c) * ((1 + rate) ** months - 1)
+  return paid + max(future - months * len(active) / 2 - 1, 0)
+
 class LoanQueueCompare:
   def __init__(self, q_list: list):
 
     # Primary attributes
-    self.grid = q_list
+    self._grid = q_list
+
+    # Lazy compares (see lazy()) solve strategies when first needed
+    self._pending = None
+    self._solved = {}
+    self._goal = None
+
+  #   Compare of queue solved with every strategy in keys, ordered by
+  #   goal, where nothing is solved until it's asked for
+  #   top() races the strategies month by month and drops each one as
+  #   soon as it can't beat the best finished so far; anything needing
+  #   the whole grid solves the rest
+  @classmethod
+  def lazy(cls, queue, keys: list, minimum='int', goal='interest', cache=None):
+    compare = cls([])
+    compare._pending = (queue, list(keys), minimum, cache)
+    compare._goal = goal
+    return compare
+
+  @property
+  def grid(self):
+    if self._pending is not None:
+      queue, keys, minimum, cache = self._pending
+      self._grid = [self._solved[i] if i in self._solved else queue.debt_solve(key, minimum, cache=cache)
+                    for i, key in enumerate(keys)]
+      self._pending = None
+      self._solved = {}
+      self.order_by(self._goal)
+    return self._grid
+
+  @grid.setter
+  def grid(self, q_list):
+    self._grid = q_list
+    self._pending = None
 
   def top(self):
+    if self._pending is not None and self._goal in PROGRESS:
+      with instrument.timer('finish.top'):
+        return self._race()
     return self.grid[0]
-  
+
   def to_json(self):
     return [queue.to_json() for queue in self.grid]
 
@@ -28,3 +98,49 @@ class LoanQueueCompare:
   def display_info(self, **kwargs):
     for q in self.grid:
       q.display_info(**kwargs)
+
+  # Winner of the lazy grid without solving every strategy to the end
+  # Strategies sit on a heap by the least they could still finish on
+  # (what they've paid so far, or a tighter bound) and the most
+  # promising one pays the next month; the first to come off the heap
+  # finished has won, everything left on it can't beat it. Ties go to
+  # the strategy listed first, as order_by()
+  def _race(self):
+    queue, keys, minimum, cache = self._pending
+    progress = bound = PROGRESS[self._goal]
+    # The interest bound assumes today's rates and budget to the end, a
+    # timeline can lower them; progress so far holds either way
+    if self._goal == 'interest' and minimum == 'int' and queue.timeline is None:
+      budget = to_cents(queue.budget)
+      bound = lambda loans: _interest_bound(loans, budget)
+
+    heap, running = [], {}
+    for i, key in enumerate(keys):
+      if i not in self._solved and cache is not None:
+        found, result = queue._cache_get(cache, cache.digest(queue._solve_key(get_strategy(key).name, minimum)))
+        if found:
+          self._solved[i] = result
+      if i in self._solved:
+        heap.append((progress(self._solved[i].Q), i, True))
+        continue
+      months = queue._iter_solve(get_strategy(key), minimum)
+      running[i] = (months, list(next(months)))
+      heap.append((bound(running[i][1]), i, False))
+    heapq.heapify(heap)
+
+    while True:
+      _, i, done = heapq.heappop(heap)
+      if done:
+        return self._solved[i]
+      months, loans = running[i]
+      try:
+        next(months)
+      except StopIteration as finished:
+        del running[i]
+        result = finished.value
+        if cache is not None:
+          result = queue._cache_put(cache, cache.digest(queue._solve_key(get_strategy(keys[i]).name, minimum)), result)
+        self._solved[i] = result
+        heapq.heappush(heap, (progress(result.Q), i, True))
+        continue
+      heapq.heappush(heap, (bound(loans), i, False))
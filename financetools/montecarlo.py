@@ -0,0 +1,192 @@
+import random
+import statistics
+from itertools import repeat
+from .ledger import to_cents
+from .loan import Loan
+from .batch import PortfolioBatch, _solve, _min_payment
+from .loan_queue import STRATEGIES
+from .strategies import get_strategy
+
+#########################################
+#   Monte Carlo rate scenarios
+#   Simulates variable-rate loans along random rate paths and reports
+#   the spread of interest paid and duration per strategy
+#   A rate model moves a shared index (in hundredths of a percent)
+#   every `reset` months; variable loans pay their starting rate plus
+#   the index. Every path has its own generator seeded from (seed,
+#   path), so results don't depend on chunking or executors, and
+#   every strategy sees the same paths
+#   Paths run in lockstep on the batch engine, chunks of them on an
+#   optional (process pool) executor
+#########################################
+
+DEFAULT_STRATEGIES = tuple(STRATEGIES)
+
+###############################
+#   RATE MODELS
+###############################
+class RandomWalk:
+    #   sigma, drift: percentage points per reset
+    def __init__(self, sigma=0.25, drift=0.0, reset=1):
+        self.sigma = sigma
+        self.drift = drift
+        self.reset = reset
+
+    #   Next index (hundredths) from the current one
+    def step(self, rng, index):
+        return index + round(rng.gauss(self.drift, self.sigma) * 100)
+
+
+class MeanReverting:
+    #   Ornstein-Uhlenbeck index: pulled back toward mean (percentage
+    #   points above the starting rates) at speed per reset
+    def __init__(self, sigma=0.25, speed=0.1, mean=0.0, reset=1):
+        self.sigma = sigma
+        self.speed = speed
+        self.mean = mean
+        self.reset = reset
+
+    def step(self, rng, index):
+        pull = self.speed * (self.mean * 100 - index)
+        return index + round(pull + rng.gauss(0, self.sigma) * 100)
+
+
+###############################
+#   RESULTS
+###############################
+class Distribution:
+    PERCENTILES = (5, 25, 50, 75, 95)
+
+    def __init__(self, values):
+        self.values = values
+
+    def summary(self):
+        if not self.values:
+            return None
+        cuts = statistics.quantiles(self.values, n=100, method='inclusive') if len(self.values) > 1 \
+            else [self.values[0]] * 99
+        return {
+            "mean": statistics.fmean(self.values),
+            "stdev": statistics.pstdev(self.values),
+            "min": min(self.values),
+            "max": max(self.values),
+            **{f"p{p}": cuts[p - 1] for p in self.PERCENTILES}
+        }
+
+
+class SimulationResult:
+    #   interest: {strategy: [interest paid per path (Decimal), None if it failed]}
+    #   duration: {strategy: [months per path, None if it failed]}
+    def __init__(self, paths, interest, duration):
+        self.paths = paths
+        self.interest = interest
+        self.duration = duration
+
+    #   Paths where the budget stopped covering minimums (or never paid off)
+    def failures(self, strategy):
+        return sum(1 for d in self.duration[strategy] if d is None)
+
+    def interest_paid(self, strategy):
+        return Distribution([float(i) for i in self.interest[strategy] if i is not None])
+
+    def durations(self, strategy):
+        return Distribution([d for d in self.duration[strategy] if d is not None])
+
+    def summary(self):
+        return {
+            key: {
+                "paths": self.paths,
+                "failures": self.failures(key),
+                "interest_paid": self.interest_paid(key).summary(),
+                "duration": self.durations(key).summary()
+            } for key in self.interest
+        }
+
+
+###############################
+#   SIMULATION
+###############################
+#   queue: LoanQueue to simulate from its current balances and budget
+#   model: RandomWalk, MeanReverting or anything with step(rng, index)
+#   and reset
+#   variable: titles (or positions) of the variable-rate loans, or a
+#   single one, None for all of them
+#   floor: lowest rate (percent) a variable loan can reach
+#   executor/chunksize: spread chunks of paths over an executor
+def simulate(queue, model, paths=1000, strategies=DEFAULT_STRATEGIES, minimum='int', variable=None,
+             seed=0, floor=0.0, executor=None, chunksize=500, max_months=1200):
+    base = PortfolioBatch.from_queues([queue])
+    if isinstance(variable, (str, int)):
+        variable = [variable]
+    variable = None if variable is None else set(variable)
+    mask = [variable is None or loan.title in variable or j in variable for j, loan in enumerate(queue.Q)]
+    starts = list(range(0, paths, chunksize))
+    counts = [min(chunksize, paths - s) for s in starts]
+
+    interest, duration = {}, {}
+    for key in strategies:
+        strategy = get_strategy(key)
+        args = (repeat(base), repeat(strategy), repeat(minimum), repeat(model), repeat(mask), repeat(seed),
+                starts, counts, repeat(to_cents(Loan.Dec(floor))), repeat(max_months))
+        chunks = map(_simulate_chunk, *args) if executor is None else executor.map(_simulate_chunk, *args)
+        interest[strategy.name], duration[strategy.name] = [], []
+        for chunk_interest, chunk_duration in chunks:
+            interest[strategy.name].extend(chunk_interest)
+            duration[strategy.name].extend(chunk_duration)
+    return SimulationResult(paths, interest, duration)
+
+# Paths first..first+count of one strategy, module level so executors can pickle it
+def _simulate_chunk(base, strategy, minimum, model, mask, seed, first, count, floor, max_months):
+    n = len(base.balances)
+    batch = PortfolioBatch.__new__(PortfolioBatch)
+    batch.balances = base.balances * count
+    batch.rates = base.rates * count
+    batch.terms = base.terms * count
+    batch.offsets = type(base.offsets)('q', range(0, n * count + 1, n))
+    batch.budgets = base.budgets * count
+    paths = _RatePaths(base, model, mask, seed, first, count, floor, minimum == 'min')
+    results = _solve(batch, strategy, minimum, max_months, paths.advance)
+    return ([r["interest_paid"] if r else None for r in results],
+            [r["duration"] if r else None for r in results])
+
+
+class _RatePaths:
+    def __init__(self, base, model, mask, seed, first, count, floor, track_minimums):
+        self.model = model
+        self.n = len(base.balances)
+        self.variable = [j for j in range(self.n) if mask[j]]
+        self.base_rates = list(base.rates)
+        self.balances = list(base.balances)
+        self.terms = list(base.terms)
+        self.floor = floor
+        self.track_minimums = track_minimums
+        self.rngs = [random.Random(f'{seed}:{first + i}') for i in range(count)]
+        self.index = [0] * count
+        self._minimums = {}
+
+    #   Batch hook: move each active path's index on reset months,
+    #   returns the paths whose rates changed
+    def advance(self, month, active, rate, minp):
+        changed = []
+        if (month - 1) % self.model.reset or month == 1:
+            return changed
+        for i in active:
+            self.index[i] = index = self.model.step(self.rngs[i], self.index[i])
+            offset = i * self.n
+            for j in self.variable:
+                r = max(self.base_rates[j] + index, self.floor)
+                if rate[offset + j] == r:
+                    continue
+                rate[offset + j] = r
+                # Loan.min_payment follows the current rate
+                if self.track_minimums:
+                    minp[offset + j] = self._min_payment(j, r)
+                if not changed or changed[-1] != i:
+                    changed.append(i)
+        return changed
+
+    def _min_payment(self, j, r):
+        key = (j, r)
+        if key not in self._minimums:
+            self._minimums[key] = _min_payment(self.balances[j], r, self.terms[j])
+        return self._minimums[key]
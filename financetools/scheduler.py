@@ -0,0 +1,97 @@
+from bisect import bisect_left, bisect_right
+from . import instrument
+
+#########################################
+#   Active loan scheduler
+#   Keeps debt_solve's temp queue in priority order month to month
+#   without re-sorting it, and hands back paid-off loans as they
+#   finish instead of rescanning the queue
+#########################################
+
+class ActiveLoans:
+    #   loans: the queue's list, already in priority order, kept in place
+    #   key: priority of a loan when it changes every month (blizzard),
+    #   None when the order is fixed
+    def __init__(self, loans: list, key=None):
+        self.loans = loans
+        self.key = key
+        self._keys = None
+        if key is not None:
+            self._rekey()
+
+    @property
+    def size(self):
+        return len(self.loans)
+
+    #   Loan that gets the remainder for targeted strategies
+    @property
+    def target(self):
+        return self.loans[-1]
+
+    #   Make one payment on every loan, reposition any whose priority
+    #   moved, and return the loans that paid off (in queue order)
+    def pay_month(self):
+        moved, done = [], []
+        for loan in self.loans:
+            history = loan.Payment_History
+            b = history.last_balance
+            loan.pay_month()
+            nb = history.last_balance
+            if nb == 0:
+                done.append(loan)
+            elif nb != b:
+                moved.append(loan)
+        if self.key is not None and moved:
+            self._reorder(moved)
+        return done
+
+    #   Pick up an order (and keys) changed from outside, e.g. a re-sort
+    #   after rates changed
+    def resync(self):
+        if self.key is not None:
+            self._rekey()
+
+    #   Drop paid-off loans, the usual case being the target at the end
+    def retire(self, done):
+        for loan in done:
+            i = self._index(loan)
+            del self.loans[i]
+            if self._keys is not None:
+                del self._keys[i]
+                del self._key_of[loan]
+
+    #   Same order a stable sort by key would give
+    #   When only one loan's key changed, it moves past the loans with
+    #   smaller keys, and past equal keys only if it was behind them
+    def _reorder(self, moved):
+        if instrument.ACTIVE is not None:
+            instrument.ACTIVE.count('sorts' if len(moved) > 1 else 'reorders')
+        if len(moved) > 1:
+            self.loans.sort(key=self.key)
+            self._rekey()
+            return
+        loan = moved[0]
+        i = self._index(loan)
+        del self.loans[i]
+        del self._keys[i]
+        k = self._key_of[loan] = self.key(loan)
+        lo = bisect_left(self._keys, k)
+        j = lo if i <= lo else bisect_right(self._keys, k)
+        self.loans.insert(j, loan)
+        self._keys.insert(j, k)
+
+    def _rekey(self):
+        self._keys = [self.key(l) for l in self.loans]
+        self._key_of = dict(zip(self.loans, self._keys))
+
+    #   Position of a loan: O(1) for the target, O(log n) by stored key
+    def _index(self, loan):
+        if self.loans[-1] is loan:
+            return len(self.loans) - 1
+        start = 0
+        if self._keys is not None:
+            start = bisect_left(self._keys, self._key_of[loan])
+        for i in range(start, len(self.loans)):
+            if self.loans[i] is loan:
+                return i
+        raise ValueError(f'{loan} is not active')
@@ -0,0 +1,196 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+from decimal import Decimal
+from .ledger import Ledger, MappedLedger, to_cents, from_cents
+from .loan import Loan
+from .loan_queue import LoanQueue
+from .loan_queue_compare import LoanQueueCompare
+from .backend import get_backend
+
+#########################################
+#   Serialization
+#   Binary: a Loan, LoanQueue or LoanQueueCompare as a small JSON
+#   header (loan and queue attributes, row counts) followed by every
+#   ledger's columns as little-endian int64 cents
+#   load() memory-maps a file and reads ledgers straight out of it
+#   (see MappedLedger), so reloading a large grid costs little more
+#   than parsing the header
+#   JSON: iter_json() streams the same text as to_json() would give,
+#   Decimals as exact numbers, straight from the ledgers' cents
+#########################################
+
+MAGIC = b'FTB1'
+VERSION = 1
+# Magic, header length
+_HEAD = struct.Struct('<4sI')
+# Ledger columns stored per loan, MappedLedger order
+_COLUMNS = (('column', 'balance'), ('column', 'principal'), ('column', 'interest'),
+            ('cumulative', 'principal'), ('cumulative', 'interest'))
+_SWAP = sys.byteorder != 'little'
+
+###############################
+#   BINARY
+###############################
+def dumps(obj):
+    return b''.join(_iter_binary(obj))
+
+def dump(obj, f):
+    for chunk in _iter_binary(obj):
+        f.write(chunk)
+
+#   Read a file written by dump(), memory-mapped
+def load(path):
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return loads(mapped)
+
+#   Read dumps() output from any bytes-like object, without copying it
+def loads(data):
+    view = memoryview(data)
+    magic, size = _HEAD.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("Not a financetools results file")
+    header = json.loads(bytes(view[_HEAD.size:_HEAD.size + size]))
+    if header["version"] != VERSION:
+        raise ValueError(f'Unsupported results file version {header["version"]}')
+
+    pos = _aligned(_HEAD.size + size)
+    loans = []
+    for meta in header["loans"]:
+        rows = meta["rows"]
+        columns = []
+        for _ in _COLUMNS:
+            columns.append(view[pos:pos + 8 * rows].cast('q'))
+            pos += 8 * rows
+        loans.append(_loan(meta, _ledger(columns, rows)))
+
+    queues, start = [], 0
+    for meta in header["queues"]:
+        budget = from_cents(meta["budget"]) if meta["budget"] is not None else None
+        queues.append(LoanQueue(loans[start:start + meta["loans"]], budget, title=meta["title"],
+                                backend=meta["backend"]))
+        start += meta["loans"]
+
+    if header["kind"] == 'loan':
+        return loans[0]
+    if header["kind"] == 'queue':
+        return queues[0]
+    return LoanQueueCompare(queues)
+
+def _iter_binary(obj):
+    kind, queues, loans = _flatten(obj)
+    header = json.dumps({
+        "version": VERSION,
+        "kind": kind,
+        "queues": [{
+            "title": q.title,
+            "budget": to_cents(q._budget) if q._budget is not None else None,
+            "backend": _backend_name(q.backend),
+            "loans": len(q.Q)
+        } for q in queues],
+        "loans": [{
+            "title": l.title,
+            "term": l.term,
+            "start_balance": to_cents(l.start_balance),
+            "int_rate": l._rate_units,
+            "payment_amt": l._payment_cents if l._payment_amt is not None else None,
+            "backend": _backend_name(l.backend),
+            "rows": l.Payment_History.rows
+        } for l in loans]
+    }, separators=(',', ':')).encode()
+    yield _HEAD.pack(MAGIC, len(header)) + header
+    yield bytes(_aligned(_HEAD.size + len(header)) - _HEAD.size - len(header))
+    for l in loans:
+        for method, key in _COLUMNS:
+            col = getattr(l.Payment_History, method)(key)
+            if _SWAP:
+                col = array('q', col)
+                col.byteswap()
+            yield col.tobytes()
+
+# (kind, queues, loans), loans in queue order
+def _flatten(obj):
+    if isinstance(obj, Loan):
+        return 'loan', [], [obj]
+    if isinstance(obj, LoanQueue):
+        return 'queue', [obj], list(obj.Q)
+    if isinstance(obj, LoanQueueCompare):
+        return 'compare', obj.grid, [l for q in obj.grid for l in q.Q]
+    raise TypeError(f'Cannot serialize {type(obj).__name__}')
+
+def _aligned(n):
+    return (n + 7) // 8 * 8
+
+def _backend_name(backend):
+    return backend if backend is None or isinstance(backend, str) else backend.name
+
+def _ledger(columns, rows):
+    if not _SWAP:
+        return MappedLedger(columns, rows)
+    ledger = MappedLedger([array('q', c) for c in columns], rows)
+    for name in MappedLedger._COLUMNS:
+        getattr(ledger, name).byteswap()
+    return ledger
+
+def _loan(meta, ledger):
+    loan = Loan.__new__(Loan)
+    loan.backend = get_backend(meta["backend"])
+    loan.title = meta["title"]
+    loan.term = meta["term"]
+    loan.start_balance = from_cents(meta["start_balance"])
+    loan.int_rate = from_cents(meta["int_rate"])
+    loan.payment_amt = from_cents(meta["payment_amt"]) if meta["payment_amt"] is not None else None
+    loan.Payment_History = ledger
+    return loan
+
+
+###############################
+#   JSON
+###############################
+#   to_json() of a Loan, LoanQueue or LoanQueueCompare (or any
+#   structure of them, dicts, lists and Decimals) as JSON text, in chunks
+def iter_json(obj):
+    if isinstance(obj, LoanQueueCompare):
+        obj = obj.grid
+    elif isinstance(obj, LoanQueue):
+        obj = obj.Q
+    if isinstance(obj, Loan):
+        yield from _loan_json(obj)
+    elif isinstance(obj, dict):
+        yield '{'
+        for n, (key, value) in enumerate(obj.items()):
+            yield f'{", " if n else ""}{json.dumps(key)}: '
+            yield from iter_json(value)
+        yield '}'
+    elif isinstance(obj, (list, tuple)):
+        yield '['
+        for n, value in enumerate(obj):
+            if n:
+                yield ', '
+            yield from iter_json(value)
+        yield ']'
+    elif isinstance(obj, Decimal):
+        yield str(obj)
+    else:
+        yield json.dumps(obj)
+
+def write_json(obj, f):
+    f.writelines(iter_json(obj))
+
+# Loan.to_json(), the payment history written from cents
+def _loan_json(loan):
+    history = loan.Payment_History
+    yield (f'{{"title": {json.dumps(loan.title)}, "term": {loan.term}, "start_balance": {loan.start_balance}, '
+           f'"int_rate": {loan.int_rate}, "payment_amt": {loan.payment_amt}, "payment_history": {{')
+    for key in Ledger.COLUMNS[:-1]:
+        yield f'"{key}": [{_cents_list(history.column(key))}], '
+    yield f'"pay_no": [{", ".join(map(str, range(history.rows)))}]}}, "analysis": '
+    yield from iter_json(loan.get_analysis())
+    yield '}'
+
+# ', '.join(str(from_cents(c)) ...) without the Decimals
+def _cents_list(col):
+    return ', '.join(['%d.%02d' % divmod(c, 100) if c >= 0 else '-%d.%02d' % divmod(-c, 100) for c in col])
@@ -0,0 +1,64 @@
+from collections import namedtuple
+from itertools import repeat
+from .ledger import to_cents, from_cents
+from .loan import Loan
+
+#########################################
+#   Loan specs
+#   A loan's terms without a payment history: a slotted, immutable
+#   tuple of integer cents (rate in hundredths of a percent), a few
+#   dozen bytes against a Loan's dict and preallocated ledger
+#   Accepted wherever a Loan is: LoanQueue() and add_loan() turn specs
+#   into Loans as they take them, PortfolioBatch.from_specs() reads
+#   them straight into columns
+#   specs() builds many from columns in one pass, see also
+#   Loan.from_columns() and LoanQueue.from_columns()
+#########################################
+
+class LoanSpec(namedtuple('LoanSpec', ['title', 'term', 'balance', 'rate', 'payment'])):
+    __slots__ = ()
+
+    #   Same arguments as Loan(); payment None when not set
+    def __new__(cls, sb, ir, pa=None, title=None, term=None):
+        return super().__new__(cls, title, int(term) if term else 12, to_cents(Loan.Dec(sb)),
+                               to_cents(Loan.Dec(ir)), to_cents(Loan.Dec(pa)) if pa is not None else None)
+
+    # Fields are already cents, so unpickle/copy without __new__
+    def __reduce__(self):
+        return (LoanSpec._make, (tuple(self),))
+
+    #   Loan attributes, as Decimals
+    @property
+    def start_balance(self):
+        return from_cents(self.balance)
+
+    @property
+    def current_bal(self):
+        return from_cents(self.balance)
+
+    @property
+    def int_rate(self):
+        return from_cents(self.rate)
+
+    @property
+    def payment_amt(self):
+        return from_cents(self.payment) if self.payment is not None else 0
+
+    #   Same as Loan.state() of the loan it makes (when titled)
+    def state(self):
+        return (self.title, self.balance, self.rate, self.payment or 0, self.term)
+
+    def to_loan(self, backend=None):
+        return Loan.from_spec(self, backend)
+
+
+#   LoanSpecs from columns, one entry per loan; terms, payments and
+#   titles may be None for the Loan defaults
+def specs(balances, rates, terms=None, payments=None, titles=None):
+    make, dec = LoanSpec._make, Loan.Dec
+    terms = repeat(None) if terms is None else terms
+    payments = repeat(None) if payments is None else payments
+    titles = repeat(None) if titles is None else titles
+    return [make((t, int(m) if m else 12, to_cents(dec(b)), to_cents(dec(r)),
+                  to_cents(dec(p)) if p is not None else None))
+            for b, r, m, p, t in zip(balances, rates, terms, payments, titles)]
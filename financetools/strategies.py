@@ -0,0 +1,219 @@
+import threading
+from decimal import Decimal, ROUND_HALF_UP
+from .ledger import CENT, to_cents, from_cents
+from .amortization import RATE_DENOM, monthly_ir
+
+#########################################
+#   Repayment strategies
+#   A strategy is an ordering rule plus an allocation kernel:
+#   ordering:   ORDER_ONCE (sorted before the first month), ORDER_EVERY
+#               (kept sorted as balances move) or None (unordered)
+#   allocate(): minimum payments and the budget remainder in, one
+#               month's payments out, all in integer cents over the
+#               balance/rate columns
+#   LoanQueue and PortfolioBatch look strategies up here once per solve
+#########################################
+
+ORDER_ONCE = 'once'
+ORDER_EVERY = 'every'
+
+class Strategy:
+    name = None
+    ordering = None
+    # Sort keys descending (the target is always last in the queue)
+    reverse = False
+
+    #   Priority of a loan from its balance and rate (cents, hundredths)
+    def cents_key(self, b: int, r: int):
+        return 0
+
+    #   Priority of a Loan, used by LoanQueue.prioritize()
+    def key(self, loan):
+        return self.cents_key(loan.Payment_History.last_balance, loan._rate_units)
+
+    #   Stable sort of loan indices into the bal/rate columns
+    def order(self, idx, bal, rate):
+        return sorted(idx, key=lambda j: self.cents_key(bal[j], rate[j]), reverse=self.reverse)
+
+    #   One month's payments for the loans idx (in queue order)
+    #   pays: their minimums, remainder: budget left after minimums
+    def allocate(self, idx, pays, remainder: int, bal, rate):
+        raise NotImplementedError
+
+    #   Whether payments stay the same between payoffs, which lets
+    #   debt_solve(event_driven=True) jump from one payoff to the next
+    def static(self, minimum):
+        return False
+
+    #   allocate() applied to Loans, remainder as a Decimal
+    def distribute(self, loans, remainder):
+        pays = self.allocate(range(len(loans)), [l._payment_cents for l in loans], to_cents(remainder),
+                             [l.Payment_History.last_balance for l in loans],
+                             [l._rate_units for l in loans])
+        for loan, pa in zip(loans, pays):
+            if pa != loan._payment_cents:
+                loan.payment_amt = from_cents(pa)
+
+
+class TargetStrategy(Strategy):
+    #   Everything past the minimums goes to the last loan in the queue
+    def allocate(self, idx, pays, remainder, bal, rate):
+        pays = list(pays)
+        pays[-1] += remainder
+        return pays
+
+    def distribute(self, loans, remainder):
+        loans[-1].payment_amt += remainder
+
+    #   Minimums are the same every month ('int' is handled by the
+    #   event solver), so only re-sorting would move the target
+    def static(self, minimum):
+        return self.ordering == ORDER_ONCE
+
+
+class SpreadStrategy(Strategy):
+    #   Integer weight of each loan, the remainder is split in proportion
+    def weights(self, idx, bal, rate):
+        raise NotImplementedError
+
+    #   Same weights in Decimal, as LoanQueue has always computed them
+    def decimal_weights(self, idx, bal, rate):
+        return [Decimal(w) for w in self.weights(idx, bal, rate)]
+
+    #   Dec(payment + weight / total * remainder), exact in integers
+    def allocate(self, idx, pays, remainder, bal, rate):
+        weights = self.weights(idx, bal, rate)
+        total = sum(weights)
+        if not total:
+            return self.decimal_allocate(idx, pays, remainder, bal, rate)
+        spread = []
+        for w, pa in zip(weights, pays):
+            q, rem = divmod(w * remainder, total)
+            # At (or within rounding noise of) half a cent, defer to Decimal
+            if abs(2 * rem - total) * 10 ** 12 <= total:
+                return self.decimal_allocate(idx, pays, remainder, bal, rate)
+            spread.append(pa + q + (2 * rem > total))
+        return spread
+
+    #   Reference Decimal arithmetic
+    def decimal_allocate(self, idx, pays, remainder, bal, rate):
+        r = from_cents(remainder)
+        weights = self.decimal_weights(idx, bal, rate)
+        total = sum(weights)
+        return [to_cents((from_cents(pa) + (w / total) * r).quantize(CENT, ROUND_HALF_UP))
+                for w, pa in zip(weights, pays)]
+
+
+###############################
+#   BUILT-INS
+###############################
+# Avalanche: target the highest interest rate (then balance)
+class Avalanche(TargetStrategy):
+    name = 'avalanche'
+    ordering = ORDER_ONCE
+
+    def cents_key(self, b, r):
+        return (r, b)
+
+# Blizzard: target the highest monthly interest cost
+class Blizzard(TargetStrategy):
+    name = 'blizzard'
+    ordering = ORDER_EVERY
+
+    def key(self, loan):
+        return loan.get_int_due()
+
+    # b * r orders loans exactly like Decimal's get_int_due(), except where
+    # two products tie and Decimal's rounding may still tell them apart
+    def order(self, idx, bal, rate):
+        ordered = sorted(idx, key=lambda j: bal[j] * rate[j])
+        for a in range(len(ordered) - 1):
+            if bal[ordered[a]] * rate[ordered[a]] == bal[ordered[a + 1]] * rate[ordered[a + 1]]:
+                return sorted(idx, key=lambda j: monthly_ir(rate[j]) * from_cents(bal[j]))
+        return ordered
+
+# Snowball: target the lowest balance
+class Snowball(TargetStrategy):
+    name = 'snowball'
+    ordering = ORDER_ONCE
+    reverse = True
+
+    def cents_key(self, b, r):
+        return b
+
+# Cascade: spread in proportion to interest rate
+class Cascade(SpreadStrategy):
+    name = 'cascade'
+
+    def weights(self, idx, bal, rate):
+        return [rate[j] for j in idx]
+
+    # Rates don't change, so neither do the shares of a fixed remainder
+    def static(self, minimum):
+        return minimum in ('min', 'avg')
+
+# Ice Slide: spread in proportion to monthly interest cost
+class IceSlide(SpreadStrategy):
+    name = 'ice_slide'
+
+    def weights(self, idx, bal, rate):
+        return [bal[j] * rate[j] for j in idx]
+
+    def decimal_weights(self, idx, bal, rate):
+        return [monthly_ir(rate[j]) * from_cents(bal[j]) for j in idx]
+
+
+# Optimal: the interest-minimizing allocation. Every extra dollar goes
+# where it saves the most interest, the highest rate; once that loan's
+# payment would clear it, the rest spills over to the next highest rate
+# (plain avalanche loses that spillover in each payoff month)
+class Optimal(Strategy):
+    name = 'optimal'
+    ordering = ORDER_ONCE
+
+    def cents_key(self, b, r):
+        return (r, b)
+
+    def allocate(self, idx, pays, remainder, bal, rate):
+        pays = list(pays)
+        for k in range(len(pays) - 1, -1, -1):
+            if not remainder:
+                break
+            j = idx[k]
+            # Smallest payment that clears balance plus this month's interest
+            need = bal[j] - (-bal[j] * rate[j] // RATE_DENOM) - pays[k]
+            extra = min(remainder, max(need, 0))
+            pays[k] += extra
+            remainder -= extra
+        # Everything will be paid off, what's left goes unused by the target
+        pays[-1] += remainder
+        return pays
+
+
+###############################
+#   REGISTRY
+###############################
+REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+
+#   Make a strategy available by name to LoanQueue and PortfolioBatch
+def register_strategy(strategy, replace=False):
+    if not isinstance(strategy, Strategy):
+        raise TypeError("strategy must be a Strategy instance")
+    with _REGISTRY_LOCK:
+        if strategy.name in REGISTRY and not replace:
+            raise ValueError(f'Strategy "{strategy.name}" is already registered')
+        REGISTRY[strategy.name] = strategy
+    return strategy
+
+#   Accepts a strategy name or instance
+def get_strategy(key):
+    if isinstance(key, Strategy):
+        return key
+    try:
+        return REGISTRY[key]
+    except KeyError:
+        raise ValueError(f'Unknown strategy "{key}"') from None
+
+for _strategy in (Avalanche(), Blizzard(), Snowball(), Cascade(), IceSlide(), Optimal()):
+    register_strategy(_strategy)
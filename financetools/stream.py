@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+from .ledger import Payment, from_cents
+
+#########################################
+#   Schedule sinks
+#   Consume Payment rows from Loan.iter_schedule() or
+#   LoanQueue.iter_months() without keeping them
+#   iter_csv()/iter_jsonl() yield text line by line (e.g. as an HTTP
+#   response body), write_csv()/write_jsonl() write to a file, and
+#   Totals tallies rows as they pass through
+#########################################
+
+FIELDS = Payment._fields
+
+#   CSV text, header first, one line per row
+def iter_csv(rows, header=True):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header:
+        writer.writerow(FIELDS)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, nothing streamed
+    if buffer.tell():
+        yield buffer.getvalue()
+
+#   JSON lines, Decimals written as exact numbers
+def iter_jsonl(rows):
+    for title, pay_no, balance, principal, interest in rows:
+        yield (f'{{"title": {json.dumps(title)}, "pay_no": {pay_no}, "balance": {balance}, '
+               f'"principal": {principal}, "interest": {interest}}}\n')
+
+def write_csv(rows, f, header=True):
+    f.writelines(iter_csv(rows, header))
+
+def write_jsonl(rows, f):
+    f.writelines(iter_jsonl(rows))
+
+
+class Totals:
+    #   Running analysis of a stream, the same figures as get_analysis()
+    #   for duration, payments, principal, interest and total paid
+    def __init__(self):
+        self.duration = 0
+        self.num_payments = 0
+        self.principal_paid = from_cents(0)
+        self.interest_paid = from_cents(0)
+
+    #   Pass rows through unchanged while counting them, e.g.
+    #   write_csv(totals.track(loan.iter_schedule()), f)
+    def track(self, rows):
+        for row in rows:
+            self.add(row)
+            yield row
+
+    def add(self, row):
+        if row.pay_no:
+            self.duration = max(self.duration, row.pay_no)
+            self.num_payments += 1
+            self.principal_paid += row.principal
+            self.interest_paid += row.interest
+
+    def consume(self, rows):
+        for row in rows:
+            self.add(row)
+        return self.get_analysis()
+
+    def get_analysis(self):
+        return {
+            "duration": self.duration,
+            "num_payments": self.num_payments,
+            "principal_paid": self.principal_paid,
+            "interest_paid": self.interest_paid,
+            "total_paid": self.principal_paid + self.interest_paid
+        }
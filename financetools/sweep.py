@@ -0,0 +1,166 @@
+import os
+from array import array
+from math import ceil
+from .amortization import interest_due
+from .loan import Loan
+from .batch import PortfolioBatch, _min_payment
+from .loan_queue import STRATEGIES
+from .strategies import get_strategy
+
+#########################################
+#   Budget sweep
+#   Solves one LoanQueue over a grid of budgets and rate shocks for
+#   every strategy, as rows of a compact SweepTable
+#   Each strategy is one PortfolioBatch over all grid points, so the
+#   points are solved in lockstep (and in chunks on an executor);
+#   points whose budget can't cover the first month's minimums are
+#   ruled out without solving, and a SolveCache can carry points
+#   between sweeps
+#   Points share what doesn't depend on the budget: first-month
+#   minimums are worked out once per rate shock, minimum payments once
+#   per loan (see batch._solve), and repeated points are solved once.
+#   Month-by-month state can't be shared, the budget changes every
+#   allocation from the first month on
+#########################################
+
+# Strategies swept by default, as finish()
+DEFAULT_STRATEGIES = tuple(STRATEGIES)
+
+class SweepTable:
+    COLUMNS = ('budget', 'rate_shock', 'strategy', 'duration', 'num_payments',
+               'principal_paid', 'interest_paid', 'total_paid')
+    # finish() goals -> column
+    GOALS = {'interest': 'interest_paid', 'time': 'duration', 'num_p': 'num_payments'}
+
+    #   rows: tuples in COLUMNS order, results are None where the
+    #   budget can't pay the queue off
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def column(self, name):
+        i = self.COLUMNS.index(name)
+        return [row[i] for row in self.rows]
+
+    # Best strategy at every (budget, rate_shock) point with a solution,
+    # ties go to the strategy listed first
+    def best(self, goal='interest'):
+        i = self.COLUMNS.index(self.GOALS[goal])
+        best = {}
+        for row in self.rows:
+            if row[i] is None:
+                continue
+            point = row[:2]
+            if point not in best or row[i] < best[point][i]:
+                best[point] = row
+        return list(best.values())
+
+    def to_json(self):
+        return {name: self.column(name) for name in self.COLUMNS}
+
+
+#   queue: the LoanQueue to sweep (its own budget is ignored)
+#   budgets: monthly budgets to try
+#   rate_shocks: percentage points added to every loan's rate
+#   executor/chunksize: solve chunks of grid points concurrently
+#   cache: SolveCache for results per grid point
+#   max_months: points still paying after this long count as unpayable
+def sweep(queue, budgets, rate_shocks=(0,), strategies=DEFAULT_STRATEGIES, minimum='int',
+          executor=None, chunksize=None, cache=None, max_months=1200):
+    if queue.timeline is not None:
+        raise ValueError(f'{queue.title}: batch solves do not read event timelines')
+    budgets = [Loan.Dec(b) for b in budgets]
+    rate_shocks = [Loan.Dec(s) for s in rate_shocks]
+    strategies = [get_strategy(s) for s in strategies]
+    points = [(b, s) for s in rate_shocks for b in budgets]
+    # Rows carry no titles, the numbers are the key
+    state = tuple(l._key() for l in queue.Q)
+
+    # Loans as batch columns, one copy per point
+    balances, rates, terms, offsets = [], [], [], [0]
+    for budget, shock in points:
+        for loan in queue.Q:
+            balances.append(loan.current_bal)
+            rates.append(loan.int_rate + shock)
+            terms.append(loan.term)
+        offsets.append(len(balances))
+    batch = PortfolioBatch(balances, rates, terms, offsets, budgets * len(rate_shocks))
+    floors = _first_minimums(batch, [s for _, s in points], minimum)
+    # Points solved in place of their repeats
+    first = {}
+    first = [first.setdefault((batch.budgets[i], shock), i) for i, (_, shock) in enumerate(points)]
+
+    if executor is not None and chunksize is None:
+        chunksize = max(ceil(len(points) / (os.cpu_count() or 1)), 1)
+
+    rows = []
+    for strategy in strategies:
+        results, keys, todo = [None] * len(points), [None] * len(points), []
+        for i, (budget, shock) in enumerate(points):
+            if (floors is not None and batch.budgets[i] < floors[i]) or first[i] != i:
+                continue
+            if cache is not None:
+                keys[i] = cache.digest(('sweep', strategy.name, minimum, str(budget), str(shock), max_months) + state)
+                found, results[i] = cache.get(keys[i])
+                if found:
+                    continue
+            todo.append(i)
+
+        if todo:
+            solved = _subset(batch, todo).solve(strategy, minimum, executor=executor,
+                                                chunksize=chunksize or 1000, max_months=max_months)
+            for i, analysis in zip(todo, solved):
+                results[i] = _result(analysis)
+                if cache is not None:
+                    cache.put(keys[i], results[i])
+        results = [results[first[i]] for i in range(len(points))]
+
+        for (budget, shock), result in zip(points, results):
+            rows.append((budget, shock, strategy.name) + (result or (None,) * 5))
+    return SweepTable(rows)
+
+# Minimums due in the first month per point, in cents, None when they
+# depend on the budget ('avg'). The same for every budget, so worked
+# out once per rate shock (shocks: one per point)
+def _first_minimums(batch, shocks, minimum):
+    if minimum == 'avg':
+        return None
+    per_shock = {}
+    for i, shock in enumerate(shocks):
+        if shock in per_shock:
+            continue
+        loans = range(batch.offsets[i], batch.offsets[i + 1])
+        if minimum == 'int':
+            per_shock[shock] = sum(interest_due(batch.balances[j], batch.rates[j]) for j in loans)
+        else:
+            try:
+                per_shock[shock] = sum(_min_payment(batch.balances[j], batch.rates[j], batch.terms[j])
+                                       for j in loans)
+            except ArithmeticError:
+                per_shock[shock] = 0
+    return [per_shock[shock] for shock in shocks]
+
+# Batch of the given portfolios only
+def _subset(batch, points):
+    part = PortfolioBatch.__new__(PortfolioBatch)
+    part.balances, part.rates, part.terms = array('q'), array('q'), array('q')
+    part.offsets, part.budgets = array('q', [0]), array('q')
+    for i in points:
+        lo, hi = batch.offsets[i], batch.offsets[i + 1]
+        part.balances.extend(batch.balances[lo:hi])
+        part.rates.extend(batch.rates[lo:hi])
+        part.terms.extend(batch.terms[lo:hi])
+        part.offsets.append(len(part.balances))
+        part.budgets.append(batch.budgets[i])
+    return part
+
+def _result(analysis):
+    if analysis is None:
+        return None
+    return (analysis["duration"], analysis["num_payments"], analysis["principal_paid"],
+            analysis["interest_paid"], analysis["total_paid"])
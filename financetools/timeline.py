@@ -0,0 +1,103 @@
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from math import inf
+
+#########################################
+#   Event timeline
+#   Sparse, sorted one-off changes read by Loan.payoff() and
+#   LoanQueue.debt_solve(): lump sums, rate changes and budget changes
+#   Months count payments from the start of the solve, month 1 being
+#   the first payment it makes
+#   Solves only stop at months with events; between them payoff()
+#   defers whole runs of payments and debt_solve(event_driven=True)
+#   jumps from payoff to payoff as usual
+#########################################
+
+#   Extra payment made in month, on top of the budget (or a loan's
+#   payment). loan: title of the loan it goes to in a queue, None to
+#   hand it out like the rest of the budget
+LumpSum = namedtuple('LumpSum', ['month', 'amount', 'loan'], defaults=(None,))
+#   New interest rate (percent) from month on. loan: title, None for
+#   every loan in a queue
+RateChange = namedtuple('RateChange', ['month', 'rate', 'loan'], defaults=(None,))
+#   New budget from month on, a Loan's payment_amt on a Loan timeline
+BudgetChange = namedtuple('BudgetChange', ['month', 'budget'])
+
+EVENTS = (LumpSum, RateChange, BudgetChange)
+
+class Timeline:
+    def __init__(self, events=()):
+        self.events = []
+        self.months = []
+        for event in events:
+            self.add(event)
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        return iter(self.events)
+
+    #   Insert an event, after any already in the same month
+    def add(self, event):
+        from .loan import Loan
+        if not isinstance(event, EVENTS):
+            raise TypeError(f'Unknown timeline event {event!r}')
+        if int(event.month) != event.month or event.month < 1:
+            raise ValueError(f'Event months start at 1, got {event.month}')
+        # Amounts and rates as quantized Decimals, like Loan attributes
+        event = event._replace(**{event._fields[1]: Loan.Dec(event[1])})
+        i = bisect_right(self.months, event.month)
+        self.months.insert(i, event.month)
+        self.events.insert(i, event)
+        return self
+
+    #   Events in month, in the order they were added
+    def at(self, month):
+        return self.events[bisect_left(self.months, month):bisect_right(self.months, month)]
+
+    #   First month after month with an event, inf if none
+    def next_after(self, month):
+        i = bisect_right(self.months, month)
+        return self.months[i] if i < len(self.months) else inf
+
+    #   Plain values for solve cache keys
+    def state(self):
+        return tuple((type(e).__name__,) + tuple(str(v) for v in e) for e in self.events)
+
+    ###############################
+    #   APPLYING
+    ###############################
+    #   Month's changes to a Loan, returns the lump sum to add to this
+    #   month's payment
+    def apply_loan(self, loan, month):
+        extra = 0
+        for event in self.at(month):
+            if isinstance(event, LumpSum):
+                extra += event.amount
+            elif isinstance(event, RateChange):
+                loan.int_rate = event.rate
+            else:
+                loan.payment_amt = event.budget
+        return extra
+
+    #   Month's changes to a queue being solved, returns
+    #   (lump sum for the budget, [(loan, lump sum for its payment)],
+    #   whether any rate changed)
+    def apply_queue(self, queue, month):
+        extra, targeted, rates = 0, [], False
+        for event in self.at(month):
+            if isinstance(event, BudgetChange):
+                queue.budget = event.budget
+                continue
+            loans = [l for l in queue.Q if event.loan is None or l.title == event.loan]
+            if isinstance(event, RateChange):
+                for loan in loans:
+                    loan.int_rate = event.rate
+                rates = rates or bool(loans)
+            elif event.loan is not None and loans:
+                targeted.append((loans[0], event.amount))
+            else:
+                # Loan already paid off, the lump goes to the others
+                extra += event.amount
+        return extra, targeted, rates
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from financetools import Loan, LoanQueue, SolveCache
+
+class AsyncSolveTest(unittest.TestCase):
+  def setUp(self):
+    self.loans = [
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ]
+    self.loan_queue = LoanQueue(self.loans, 750, title="Test Loans")
+    # Only just covers the interest, pays off in 1292 months
+    self.slow_queue = LoanQueue(self.loans, 91, title="Slow")
+
+  def test_matches_sync(self):
+    async def solve():
+      return (await self.loan_queue.async_debt_solve('blizzard', 'int', yield_every=1),
+              await self.loan_queue.async_finish('time'))
+    solved, grid = asyncio.run(solve())
+    self.assertEqual(solved.to_json(), self.loan_queue.debt_solve('blizzard', 'int').to_json())
+    self.assertEqual([q.get_analysis() for q in grid.grid],
+                     [q.get_analysis() for q in self.loan_queue.finish('time').grid])
+
+  def test_yields_to_loop(self):
+    ticks = []
+    async def ticker():
+      while True:
+        ticks.append(None)
+        await asyncio.sleep(0)
+    async def solve():
+      task = asyncio.ensure_future(ticker())
+      await self.loan_queue.async_debt_solve('avalanche', 'int', yield_every=5)
+      task.cancel()
+    asyncio.run(solve())
+    # 35 months, control handed back every 5
+    self.assertGreaterEqual(len(ticks), 6)
+
+  def test_cancel(self):
+    async def solve():
+      task = asyncio.ensure_future(self.slow_queue.async_finish(yield_every=1))
+      await asyncio.sleep(0)
+      task.cancel()
+      with self.assertRaises(asyncio.CancelledError):
+        await task
+    asyncio.run(solve())
+
+  def test_timeout_and_max_months(self):
+    async def solve(**kwargs):
+      return await self.slow_queue.async_debt_solve('avalanche', 'int', **kwargs)
+    with self.assertRaises(asyncio.TimeoutError):
+      asyncio.run(solve(timeout=0))
+    with self.assertRaises(ValueError):
+      asyncio.run(solve(max_months=120))
+    with ThreadPoolExecutor(max_workers=1) as pool:
+      with self.assertRaises(ValueError):
+        asyncio.run(solve(max_months=120, executor=pool))
+
+  def test_executor_and_cache(self):
+    cache = SolveCache()
+    async def solve(pool):
+      return await self.loan_queue.async_finish(executor=pool, cache=cache)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+      grid = asyncio.run(solve(pool))
+    self.assertEqual(cache.stats["misses"], 5)
+    self.assertIs(asyncio.run(solve(None)).top(), grid.top())
+    self.assertEqual(cache.stats["hits"], 5)
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from financetools import Loan
+
+class AmortizationTest(unittest.TestCase):
+  def setUp(self):
+    self.loan = Loan(245000, 6.1, title="Mortgage", term=360)
+    self.loan.payment_amt = self.loan.min_payment
+
+  def test_exact_schedule_matches_payoff(self):
+    exact = self.loan.solve_schedule()
+    stepped = self.loan.solve()
+    self.assertEqual(exact.Payment_History.to_json(), stepped.Payment_History.to_json())
+    self.assertEqual(exact.get_analysis(), stepped.get_analysis())
+
+  def test_closed_form_agrees_with_exact(self):
+    exact = self.loan.solve_schedule()
+    estimate = self.loan.solve_closed_form()
+    self.assertEqual(estimate["num_payments"], exact.pay_no)
+    self.assertAlmostEqual(float(estimate["interest_paid"]), float(exact.get_interest_paid()), delta=5)
+
+  def test_estimated_schedule(self):
+    estimate = self.loan.solve_schedule(exact=False)
+    self.assertEqual(estimate.pay_no, 360)
+    self.assertTrue(estimate.is_complete())
+    self.assertEqual(estimate.get_principal_paid(), Loan.Dec(245000))
+
+  def test_past_recursion_limit(self):
+    loan = Loan(245000, 6.1, 1250, title="Long", term=360)
+    self.assertEqual(loan.solve_schedule().pay_no, loan.solve_closed_form()["num_payments"])
+    self.assertGreater(loan.solve_schedule().pay_no, 1000)
+
+  def test_cannot_payoff(self):
+    loan = Loan(10000, 12, 50, term=12)
+    self.assertEqual(loan.solve_schedule().pay_no, 0)
+    self.assertEqual(loan.solve_closed_form()["num_payments"], float('inf'))
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from decimal import Context
+from financetools import Loan, LoanQueue
+from financetools.backend import DecimalBackend, get_backend
+
+class BackendTest(unittest.TestCase):
+  def setUp(self):
+    self.budget = 1200
+    self.loans = [
+      Loan(2406.65, 4.41, title="2014", term=120),
+      Loan(2472.91, 3.61, title="2013", term=120),
+      Loan(6282.30, 6.1, title="2012", term=120),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ]
+
+  def test_cents_matches_decimal(self):
+    for key in ['avalanche', 'cascade', 'blizzard', 'ice_slide', 'snowball']:
+      decimal = LoanQueue(self.loans, self.budget).debt_solve(key, 'int')
+      cents = LoanQueue(self.loans, self.budget, backend='cents').debt_solve(key, 'int')
+      self.assertEqual(cents.to_json(), decimal.to_json())
+      self.assertTrue(all(l.backend is get_backend('cents') for l in cents.Q))
+
+  def test_half_cent_interest(self):
+    # $6.00 at 1% accrues exactly half a cent of interest
+    decimal = Loan(6, 1, 0.01, term=12).pay_month()
+    cents = Loan(6, 1, 0.01, term=12, backend='cents').pay_month()
+    self.assertEqual(cents.Payment_History.to_json(), decimal.Payment_History.to_json())
+
+  def test_fixed_context(self):
+    loan = Loan(245000, 6.1, 1500, title="Mortgage", term=360, backend=DecimalBackend(Context(prec=28)))
+    default = Loan(245000, 6.1, 1500, title="Mortgage", term=360)
+    self.assertEqual(loan.solve().to_json(), default.solve().to_json())
+
+  def test_unknown_backend(self):
+    with self.assertRaises(ValueError):
+      Loan(100, 1, backend='float')
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from financetools import Loan, LoanQueue
+from financetools.batch import PortfolioBatch
+
+class PortfolioBatchTest(unittest.TestCase):
+  def setUp(self):
+    self.queues = [
+      LoanQueue([
+        Loan(2406.65, 4.41, title="2014", term=120),
+        Loan(2472.91, 3.61, title="2013", term=120),
+        Loan(6282.30, 6.1, title="2012", term=120),
+        Loan(5930.42, 6.1, title="2011", term=120)
+      ], 1200),
+      LoanQueue([
+        Loan(3245.65, 4.41, title="2014", term=36),
+        Loan(12002.91, 3.61, title="2013", term=120),
+        Loan(2481.30, 6.1, title="2012", term=60),
+        Loan(5930.42, 6.1, title="2011", term=120)
+      ], 750),
+      LoanQueue([Loan(245000, 6.1, title="Mortgage", term=360)], 1600)
+    ]
+    self.batch = PortfolioBatch.from_queues(self.queues)
+
+  def test_matches_debt_solve(self):
+    for minimum in ['int', 'min', 'avg']:
+      for key in ['avalanche', 'cascade', 'blizzard', 'ice_slide', 'snowball']:
+        expected = [q.debt_solve(key, minimum).get_analysis() for q in self.queues]
+        self.assertEqual(self.batch.solve(key, minimum), expected)
+
+  def test_budget_too_small(self):
+    batch = PortfolioBatch([245000, 1000], [6.1, 5], [360, 12], [0, 1, 2], [100, 500])
+    results = batch.solve('avalanche')
+    self.assertIsNone(results[0])
+    self.assertEqual(results[1]["duration"], 3)
+
+  def test_no_minimum_payment(self):
+    # A 0% loan has no 'min' payment, only its own portfolio fails
+    batch = PortfolioBatch([1000, 2406.65, 2406.65], [0, 4.41, 4.41], [12, 120, 120], [0, 2, 3], [300, 300])
+    results = batch.solve('avalanche', 'min')
+    self.assertIsNone(results[0])
+    expected = LoanQueue([Loan(2406.65, 4.41, term=120)], 300).debt_solve('avalanche', 'min')
+    self.assertEqual(results[1], expected.get_analysis())
+
+  def test_chunked_executor(self):
+    with ThreadPoolExecutor(max_workers=2) as pool:
+      self.assertEqual(self.batch.solve('blizzard', executor=pool, chunksize=2), self.batch.solve('blizzard'))
+
+if __name__ == "__main__":
+  unittest.main()
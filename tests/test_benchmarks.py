@@ -0,0 +1,18 @@
+import io
+import unittest
+from benchmarks import suite
+
+class BenchmarkSuiteTest(unittest.TestCase):
+  def test_quick_run(self):
+    results = suite.run(quick=True, only=['histories'], repeat=1, min_time=0, out=io.StringIO())
+    self.assertEqual(list(results["results"]), ['histories[term=120]'])
+    self.assertEqual(results["results"]['histories[term=120]']["params"], {'term': 120})
+
+  def test_compare(self):
+    baseline = {"results": {"a": {"min": 1.0}, "b": {"min": 1.0}, "gone": {"min": 1.0}}}
+    current = {"results": {"a": {"min": 1.05}, "b": {"min": 1.5}, "new": {"min": 9.0}}}
+    self.assertEqual(suite.compare(baseline, current, 0.10), {"b": 1.5})
+    self.assertEqual(suite.compare(baseline, current, 0.60), {})
+
+if __name__ == "__main__":
+  unittest.main()
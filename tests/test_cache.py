@@ -0,0 +1,110 @@
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from financetools import Loan, LoanQueue
+from financetools.cache import SolveCache
+
+class SolveCacheTest(unittest.TestCase):
+  def setUp(self):
+    self.loan = Loan(2406.65, 4.41, 250, title="2014", term=12)
+    self.loan_queue = LoanQueue([
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ], 750, title="Test Loans")
+    self.cache = SolveCache(maxsize=8)
+
+  def test_hits_share_frozen_result(self):
+    first = self.loan_queue.debt_solve('avalanche', 'int', cache=self.cache)
+    again = LoanQueue([l.branch() for l in self.loan_queue.Q], 750, title="Test Loans")
+    second = again.debt_solve('avalanche', 'int', cache=self.cache)
+    self.assertIs(first, second)
+    self.assertEqual(first.to_json(), self.loan_queue.debt_solve('avalanche', 'int').to_json())
+    self.assertEqual(self.cache.stats["hits"], 1)
+    self.assertEqual(self.cache.stats["misses"], 1)
+    with self.assertRaises(TypeError):
+      first.budget = 10
+    with self.assertRaises(TypeError):
+      first.Q[0].pay_month()
+    with self.assertRaises(AttributeError):
+      first.Q.append(self.loan)
+    # Branches are ordinary loans again
+    self.assertEqual(first.Q[0].branch().pay_month().pay_no, 1)
+
+  def test_key_covers_inputs(self):
+    self.loan_queue.debt_solve('avalanche', 'int', cache=self.cache)
+    self.loan_queue.debt_solve('avalanche', 'min', cache=self.cache)
+    self.loan_queue.debt_solve('snowball', 'int', cache=self.cache)
+    self.loan_queue.budget = 800
+    self.loan_queue.debt_solve('avalanche', 'int', cache=self.cache)
+    self.assertEqual(self.cache.stats["misses"], 4)
+    self.assertEqual(self.cache.stats["hits"], 0)
+
+  def test_loan_solves(self):
+    solved = self.loan.solve(cache=self.cache)
+    self.assertIs(self.loan.solve(cache=self.cache), solved)
+    self.assertEqual(solved.to_json(), self.loan.solve().to_json())
+    self.assertEqual(self.loan.recursive_solve(cache=self.cache), tuple(self.loan.recursive_solve()))
+    self.assertEqual(self.loan.recursive_solve(3, cache=self.cache), tuple(self.loan.recursive_solve(3)))
+    self.assertEqual(self.cache.stats["misses"], 3)
+
+  def test_titles_not_in_key(self):
+    solved = [Loan(5000, 5, 300).solve(cache=self.cache) for _ in range(3)]
+    self.assertEqual(self.cache.stats["hits"], 2)
+    self.assertEqual(len({l.title for l in solved}), 3)
+    self.assertEqual(solved[1].to_json()["payment_history"], solved[0].to_json()["payment_history"])
+
+    first = self.loan_queue.debt_solve('avalanche', 'int', cache=self.cache)
+    renamed = LoanQueue([Loan(l.start_balance, l.int_rate, title=f"New {l.title}", term=l.term)
+                         for l in self.loan_queue.Q], 750, title="Renamed")
+    second = renamed.debt_solve('avalanche', 'int', cache=self.cache)
+    self.assertEqual(self.cache.stats["hits"], 3)
+    self.assertEqual(second.title, "Renamed")
+    self.assertEqual([l.title for l in second.Q], [f"New {l.title}" for l in first.Q])
+    self.assertEqual(second.to_json(), renamed.debt_solve('avalanche', 'int').to_json())
+    self.assertIs(second.Q[0].Payment_History, first.Q[0].Payment_History)
+    self.assertIs(self.loan_queue.debt_solve('avalanche', 'int', cache=self.cache), first)
+    with self.assertRaises(TypeError):
+      first.prioritize('avalanche')
+    with self.assertRaises(TypeError):
+      second.add_loan(self.loan)
+
+  def test_lru_and_ttl(self):
+    cache = SolveCache(maxsize=2, ttl=60)
+    for n in range(3):
+      cache.memoize(('n', n), lambda: [n])
+    self.assertEqual(cache.stats["evictions"], 1)
+    self.assertEqual(cache.get(cache.digest(('n', 0))), (False, None))
+    self.assertEqual(cache.get(cache.digest(('n', 2))), (True, (2,)))
+    cache.ttl = 0
+    cache.memoize(('n', 3), lambda: [3])
+    time.sleep(0.01)
+    self.assertEqual(cache.get(cache.digest(('n', 3))), (False, None))
+    self.assertEqual(cache.stats["expirations"], 1)
+
+  def test_disk_store(self):
+    with tempfile.TemporaryDirectory() as d:
+      path = os.path.join(d, 'solves')
+      cache = SolveCache(path=path)
+      expected = self.loan_queue.debt_solve('blizzard', 'int', cache=cache).to_json()
+      cache.close()
+      reopened = SolveCache(path=path)
+      result = self.loan_queue.debt_solve('blizzard', 'int', cache=reopened)
+      self.assertEqual(result.to_json(), expected)
+      self.assertEqual(reopened.stats["disk_hits"], 1)
+      reopened.close()
+
+  def test_finish(self):
+    self.loan_queue.debt_solve('cascade', 'int', cache=self.cache)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+      compare = self.loan_queue.finish(executor=pool, cache=self.cache)
+    self.assertEqual(self.cache.stats["hits"], 1)
+    self.assertEqual(compare.to_json(), self.loan_queue.finish().to_json())
+    self.loan_queue.finish(cache=self.cache)
+    self.assertEqual(self.cache.stats["hits"], 6)
+
+if __name__ == "__main__":
+  unittest.main()
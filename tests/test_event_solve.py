@@ -0,0 +1,34 @@
+import unittest
+from financetools import Loan, LoanQueue
+
+class EventSolveTest(unittest.TestCase):
+  def setUp(self):
+    self.loan_queue = LoanQueue([
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120),
+      Loan(1860.00, 6.1, title="2010", term=60)
+    ], 750, title="Test Loans")
+
+  def test_matches_monthly(self):
+    for key, minimum in [('avalanche', 'int'), ('snowball', 'int'), ('avalanche', 'min'),
+                         ('snowball', 'avg'), ('cascade', 'min'), ('cascade', 'avg')]:
+      monthly = self.loan_queue.debt_solve(key, minimum)
+      event = self.loan_queue.debt_solve(key, minimum, event_driven=True)
+      self.assertEqual(event.get_analysis(), monthly.get_analysis())
+      self.assertEqual(event.to_json(), monthly.to_json())
+
+  def test_other_strategies_fall_back(self):
+    for key in ['blizzard', 'ice_slide', 'cascade']:
+      self.assertEqual(self.loan_queue.debt_solve(key, 'int', event_driven=True).to_json(),
+                       self.loan_queue.debt_solve(key, 'int').to_json())
+
+  def test_budget_never_pays_off(self):
+    # Exactly the interest due, nothing left over to pay down principal
+    loan_queue = LoanQueue([Loan(1200, 12, title="A", term=12), Loan(2400, 6, title="B", term=12)], 24)
+    with self.assertRaises(ValueError):
+      loan_queue.debt_solve('avalanche', 'int', event_driven=True)
+
+if __name__ == "__main__":
+  unittest.main()
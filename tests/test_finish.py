@@ -0,0 +1,34 @@
+import unittest
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from financetools import Loan, LoanQueue
+
+class FinishTest(unittest.TestCase):
+  def setUp(self):
+    self.loans = [
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ]
+    self.loan_queue = LoanQueue(self.loans, 750, title="Test Loans")
+    self.expected = self.loan_queue.finish('interest')
+
+  def assertSameCompare(self, compare):
+    self.assertEqual([q.get_analysis() for q in compare.grid], [q.get_analysis() for q in self.expected.grid])
+    self.assertEqual(compare.to_json(), self.expected.to_json())
+
+  def test_parallel(self):
+    self.assertSameCompare(self.loan_queue.finish('interest', parallel=True))
+
+  def test_executor(self):
+    with ThreadPoolExecutor(max_workers=5) as pool:
+      self.assertSameCompare(self.loan_queue.finish('interest', executor=pool))
+
+  def test_snapshot_pickles(self):
+    snapshot = pickle.loads(pickle.dumps(self.loan_queue.snapshot()))
+    self.assertEqual([str(l) for l in snapshot.Q], ["2014", "2013", "2012", "2011"])
+    self.assertEqual(snapshot.avalanche().get_analysis(), self.loan_queue.avalanche().get_analysis())
+
+if __name__ == "__main__":
+  unittest.main()
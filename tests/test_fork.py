@@ -0,0 +1,62 @@
+import unittest
+from financetools import Loan, LoanQueue, SolveCache
+
+class ForkTest(unittest.TestCase):
+  def setUp(self):
+    self.loan = Loan(245000, 6.1, 1500, title="Mortgage", term=360)
+    self.baseline = self.loan.solve()
+
+  # "Pay extra from month 40", the same as replaying the first 40
+  # months and then paying more
+  def test_extra_payment_from_month(self):
+    fork = self.baseline.fork(40)
+    fork.payment_amt += 200
+    fork.payoff()
+
+    replayed = self.loan.branch().pay_months(40)
+    replayed.payment_amt += 200
+    replayed.payoff()
+
+    self.assertEqual(fork.to_json(), replayed.to_json())
+    self.assertEqual(fork.get_principal_history(), replayed.get_principal_history())
+    self.assertEqual(fork.Payment_History.cumulative('interest', 10), replayed.Payment_History.cumulative('interest', 10))
+    self.assertLess(fork.pay_no, self.baseline.pay_no)
+
+  def test_parent_untouched(self):
+    before = self.baseline.to_json()
+    fork = self.baseline.fork(100)
+    fork.payment_amt = 3000
+    fork.payoff()
+    self.assertEqual(self.baseline.to_json(), before)
+
+  def test_shares_history(self):
+    fork = self.baseline.fork(300)
+    history = fork.Payment_History
+    self.assertIs(history._parent, self.baseline.Payment_History)
+    self.assertEqual(len(history._balance), 61)
+    # Forks of forks at a shared row go straight to the row's owner
+    self.assertIs(fork.fork(200).Payment_History._parent, self.baseline.Payment_History)
+    fork.pay_months(20)
+    self.assertIs(fork.fork(310).Payment_History._parent, history)
+
+  def test_fork_of_cached_result(self):
+    cached = self.loan.solve(cache=SolveCache())
+    fork = cached.fork(12)
+    fork.payment_amt = 2000
+    self.assertEqual(fork.pay_month().pay_no, 13)
+    with self.assertRaises(IndexError):
+      cached.fork(cached.pay_no + 1)
+
+  def test_queue_fork(self):
+    loan_queue = LoanQueue([
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(2481.30, 6.1, title="2012", term=60)
+    ], 300, title="Test Loans")
+    solved = loan_queue.debt_solve('avalanche', 'int')
+    forked = solved.fork(20)
+    self.assertEqual([l.pay_no for l in forked.Q], [min(20, l.pay_no) for l in solved.Q])
+    self.assertEqual(forked.get_interest_paid(),
+                     sum(l.get_interest_history()[min(20, l.pay_no)] for l in solved.Q))
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from financetools import Loan, LoanQueue
+from financetools.goal_seek import lowest_feasible
+
+class GoalSeekTest(unittest.TestCase):
+  def setUp(self):
+    self.loan_queue = LoanQueue([
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ], 750, title="Test Loans")
+
+  def duration(self, budget, key, minimum):
+    try:
+      return LoanQueue([l.branch() for l in self.loan_queue.Q], budget).debt_solve(key, minimum).get_duration()
+    except ValueError:
+      return None
+
+  def test_min_budget(self):
+    for key, minimum, months in [('avalanche', 'int', 36), ('snowball', 'int', 60),
+                                 ('cascade', 'min', 48), ('blizzard', 'avg', 24)]:
+      budget = self.loan_queue.min_budget(months, key, minimum)
+      self.assertLessEqual(self.duration(budget, key, minimum), months)
+      shorter = self.duration(budget - Loan.Dec(0.01), key, minimum)
+      self.assertTrue(shorter is None or shorter > months)
+
+  def test_payment_for_term(self):
+    loan = Loan(245000, 6.1, title="Mortgage", term=360)
+    payment = loan.payment_for_term(360)
+    self.assertAlmostEqual(float(payment), float(loan.min_payment), delta=0.02)
+    for pa, within in [(payment, True), (payment - Loan.Dec(0.01), False)]:
+      branch = loan.branch()
+      branch.payment_amt = pa
+      self.assertEqual(branch.pay_months(360).is_complete(), within)
+    self.assertEqual(Loan(1000, 5, title="Short").payment_for_term(1), Loan.Dec(1004.17))
+
+  def test_search_calls(self):
+    calls = []
+    def feasible(x):
+      calls.append(x)
+      return x >= 1234
+    self.assertEqual(lowest_feasible(feasible, 1200, 1300), 1234)
+    self.assertLessEqual(len(calls), 10)
+    self.assertEqual(lowest_feasible(lambda x: x >= 5, 50, 60), 5)
+    self.assertEqual(lowest_feasible(lambda x: x >= 5000, 50, 60), 5000)
+    self.assertIsNone(lowest_feasible(lambda x: False, 0, 1, limit=100))
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,78 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from financetools import Loan
+from financetools.ingest import group, ingest, iter_queues, iter_results, read_rows
+
+BOOK = """borrower,balance,rate,term,budget
+A,3245.65,4.41,36,750
+A,12002.91,3.61,120,
+A,2481.30,6.1,60,
+A,5930.42,6.1,120,
+B,245000,6.1,360,1600
+C,2406.65,4.41,120,5
+D,2406.65,4.41,120,1200
+D,2472.91,3.61,120,
+"""
+
+class IngestTest(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.TemporaryDirectory()
+    self.csv = os.path.join(self.dir.name, "book.csv")
+    with open(self.csv, "w") as f:
+      f.write(BOOK)
+    self.jsonl = os.path.join(self.dir.name, "book.jsonl")
+    with open(self.jsonl, "w") as f:
+      for row in read_rows(self.csv, columns={"portfolio": "borrower"}):
+        f.write(json.dumps({k: v for k, v in row.items() if v is not None}) + "\n")
+    self.read = {"columns": {"portfolio": "borrower"}}
+
+  def tearDown(self):
+    self.dir.cleanup()
+
+  def test_group(self):
+    portfolios = list(group(read_rows(self.csv, **self.read)))
+    self.assertEqual([(p.id, len(p.loans), p.budget) for p in portfolios],
+                     [("A", 4, Loan.Dec(750)), ("B", 1, Loan.Dec(1600)), ("C", 1, Loan.Dec(5)),
+                      ("D", 2, Loan.Dec(1200))])
+    queue = next(iter_queues(self.csv, **self.read))
+    self.assertEqual(queue.state()[:2], ("A", 75000))
+    self.assertEqual([l.state()[1:] for l in queue.Q], [l.state()[1:] for l in [
+      Loan(3245.65, 4.41, term=36),
+      Loan(12002.91, 3.61, term=120),
+      Loan(2481.30, 6.1, term=60),
+      Loan(5930.42, 6.1, term=120)
+    ]])
+    with self.assertRaises(ValueError):
+      list(group(read_rows(self.csv)))
+
+  def test_matches_finish(self):
+    results = list(iter_results(self.csv, chunksize=3, **self.read))
+    self.assertEqual([r.portfolio for r in results], ["A", "B", "C", "D"])
+    for queue, result in zip(iter_queues(self.csv, **self.read), results):
+      if queue.title == "C":
+        self.assertEqual(result, ("C", None, None))
+        continue
+      best = queue.finish('interest', 'int').grid[0]
+      self.assertEqual(result.analysis, best.get_analysis())
+
+  def test_formats_and_executor(self):
+    expected = list(iter_results(self.csv, goal='time', **self.read))
+    self.assertEqual(list(iter_results(self.jsonl, goal='time', mapped=True)), expected)
+    with ThreadPoolExecutor(2) as executor:
+      self.assertEqual(list(iter_results(self.csv, goal='time', executor=executor, chunksize=1, prefetch=2,
+                                         mapped=True, **self.read)), expected)
+
+  def test_ingest(self):
+    out = io.StringIO()
+    self.assertEqual(ingest(self.jsonl, out, minimum='min'), 4)
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    self.assertEqual([line["portfolio"] for line in lines], ["A", "B", "C", "D"])
+    self.assertIsNone(lines[2]["analysis"])
+    self.assertIn(lines[0]["strategy"], ('avalanche', 'cascade', 'blizzard', 'ice_slide', 'snowball'))
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,59 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from financetools import Loan, LoanQueue, SolveCache, instrument
+
+class InstrumentTest(unittest.TestCase):
+  def setUp(self):
+    self.loans = [
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ]
+    self.loan_queue = LoanQueue(self.loans, 750, title="Test Loans")
+
+  def test_disabled_and_quiet(self):
+    out = io.StringIO()
+    with redirect_stdout(out):
+      loan = Loan(10000, 5, 500, title="Car")
+      loan.solve()
+      loan.recursive_solve()
+      Loan(10000, 5, 10).recursive_solve()
+      self.loan_queue.finish()
+    self.assertEqual(out.getvalue(), "")
+    self.assertIsNone(instrument.ACTIVE)
+
+  def test_counters(self):
+    events = []
+    with instrument.measure(tracer=lambda event, fields: events.append((event, fields))) as metrics:
+      solved = self.loan_queue.debt_solve('blizzard', 'int')
+      Loan(10000, 5, 500, title="Car").solve()
+      Loan(10000, 5, 10, title="Short").recursive_solve()
+    self.assertIsNone(instrument.ACTIVE)
+    self.assertEqual(metrics.counters["months"], solved.get_duration())
+    self.assertEqual(metrics.counters["debt_solve.blizzard"], 1)
+    self.assertGreater(metrics.timings["debt_solve.blizzard"], 0)
+    self.assertGreater(metrics.counters["reorders"] + metrics.counters["sorts"], 1)
+    self.assertEqual(events, [("payoff", {"title": "Car", "payments": 21}),
+                              ("minimum_not_met", {"title": "Short"})])
+    self.assertEqual(metrics.counters["payments"], 21)
+
+  def test_finish_and_cache(self):
+    cache = SolveCache()
+    metrics = instrument.enable()
+    try:
+      self.loan_queue.finish(cache=cache)
+      self.loan_queue.finish(cache=cache)
+    finally:
+      self.assertIs(instrument.disable(), metrics)
+    self.assertEqual(metrics.counters["finish"], 2)
+    self.assertEqual(metrics.counters["cache_misses"], 5)
+    self.assertEqual(metrics.counters["cache_hits"], 5)
+    self.assertEqual(sorted(k for k in metrics.timings if k.startswith('debt_solve.')),
+                     ['debt_solve.avalanche', 'debt_solve.blizzard', 'debt_solve.cascade',
+                      'debt_solve.ice_slide', 'debt_solve.snowball'])
+    self.assertEqual(set(metrics.to_json()), {"counters", "timings"})
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from decimal import Decimal
+from financetools import Loan
+from financetools.ledger import Ledger
+
+class LedgerTest(unittest.TestCase):
+  def setUp(self):
+    self.loan = Loan(2406.65, 4.41, 250, title="2014", term=12)
+
+  def test_grows_past_capacity(self):
+    ledger = Ledger(1000, 2)
+    for n in range(5):
+      ledger.append(900 - n, 100, 1)
+    self.assertEqual(ledger.pay_no, 5)
+    self.assertEqual(ledger.last_balance, 896)
+    self.assertEqual(ledger['pay_no'], [0, 1, 2, 3, 4, 5])
+
+  def test_reads_back_decimals(self):
+    self.loan.pay_months(2)
+    history = self.loan.Payment_History
+    self.assertEqual(history['balance'], [Decimal('2406.65'), Decimal('2165.49'), Decimal('1923.45')])
+    self.assertEqual(history['interest'], [Decimal('0.00'), Decimal('8.84'), Decimal('7.96')])
+    self.assertEqual(self.loan.current_bal, Decimal('1923.45'))
+    self.assertEqual(self.loan.pay_no, 2)
+
+  def test_to_json_columns(self):
+    self.loan.payoff()
+    history = self.loan.to_json()['payment_history']
+    self.assertEqual(list(history), ['balance', 'principal', 'interest', 'pay_no'])
+    self.assertEqual(len(history['balance']), self.loan.pay_no + 1)
+    self.assertEqual(history['balance'][-1], Decimal('0.00'))
+    self.assertEqual(sum(history['principal']), Loan.Dec(2406.65))
+
+  def test_running_totals(self):
+    self.loan.payoff()
+    history = self.loan.Payment_History
+    self.assertEqual(self.loan.get_interest_paid(), sum(history['interest']))
+    self.assertEqual(self.loan.get_principal_paid(), sum(history['principal']))
+    principal_history = self.loan.get_principal_history()
+    self.assertEqual(principal_history[5], sum(history['principal'][:6]))
+    self.assertEqual(principal_history[-1], self.loan.get_principal_paid())
+    self.assertEqual(self.loan.get_total_payment_history()[-1], self.loan.get_total_paid())
+
+if __name__ == "__main__":
+  unittest.main()
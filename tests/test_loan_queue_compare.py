@@ -1,6 +1,8 @@
 import unittest
+import itertools
 import random
-from financetools import Loan, LoanQueue, LoanQueueCompare
+from financetools import Loan, LoanQueue, LoanQueueCompare, SolveCache
+from financetools.timeline import Timeline, LumpSum, RateChange
 
 class LoanQueueTest(unittest.TestCase):
   def setUp(self):
@@ -47,5 +49,40 @@ class LoanQueueTest(unittest.TestCase):
     self.assertLessEqual(self.method_compare.grid[2].get_num_payments(), self.method_compare.grid[3].get_num_payments())
     self.assertLessEqual(self.method_compare.grid[3].get_num_payments(), self.method_compare.grid[4].get_num_payments())
 
+  def test_lazy_top_matches_finish(self):
+    # Rates that drop and a lump sum, which the race's interest bound
+    # can't see coming
+    timeline = Timeline([RateChange(2, 0.5), RateChange(2, 9, "2013"), LumpSum(3, 20000)])
+    for goal, budget, events in itertools.product(('interest', 'time', 'num_p'), (400, 750, 3000), (None, timeline)):
+      with self.subTest(goal=goal, budget=budget, timeline=events is not None):
+        queue = LoanQueue(self.loans, budget, title="Test Loans")
+        queue.timeline = events
+        eager = queue.finish(goal, optimal=True)
+        lazy = queue.finish(goal, optimal=True, lazy=True)
+        top = lazy.top()
+        self.assertEqual(top.get_analysis(), eager.top().get_analysis())
+        self.assertEqual([q.Q[0].title for q in lazy.grid], [q.Q[0].title for q in eager.grid])
+        self.assertIs(top, lazy.top())
+        self.assertEqual([q.get_analysis() for q in lazy.grid], [q.get_analysis() for q in eager.grid])
+
+  def test_lazy_cutoff(self):
+    # Cascade and blizzard both take 9 months, cascade is listed first
+    # and everything else stops the month it finishes
+    queue = LoanQueue(self.loans, 3000, title="Test Loans")
+    lazy = queue.finish('time', lazy=True)
+    self.assertEqual(lazy.top().get_analysis(), queue.cascade().get_analysis())
+    self.assertEqual(list(lazy._solved), [1])
+
+  def test_lazy_cache(self):
+    cache = SolveCache()
+    queue = LoanQueue(self.loans, 750, title="Test Loans")
+    top = queue.finish('interest', cache=cache, lazy=True).top()
+    solved = cache.stats["size"]
+    self.assertLess(solved, 5)
+    # The winner comes back from the cache, the rest are solved now
+    self.assertIs(queue.finish('interest', cache=cache, lazy=True).top(), top)
+    self.assertIs(queue.finish('interest', cache=cache).top(), top)
+    self.assertEqual(cache.stats["size"], 5)
+
 if __name__ == "main":
   unittest.main()
@@ -0,0 +1,90 @@
+import random
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from financetools import Loan, LoanQueue
+from financetools.montecarlo import RandomWalk, MeanReverting
+from financetools.timeline import Timeline, RateChange
+from financetools.strategies import ORDER_ONCE, get_strategy
+
+class MonteCarloTest(unittest.TestCase):
+  def setUp(self):
+    self.loans = [
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ]
+    self.loan_queue = LoanQueue(self.loans, 750, title="Test Loans")
+
+  # One path the slow way: move the variable loans' rates between months
+  # of an ordinary debt_solve, re-ordering after a change as a timeline
+  # RateChange does
+  def reference(self, model, key, minimum, variable, seed, path):
+    rng, index = random.Random(f'{seed}:{path}'), 0
+    base = {l.title: l.int_rate for l in self.loans}
+    strategy = get_strategy(key)
+    months = self.loan_queue._iter_solve(strategy, minimum)
+    loans, month = next(months), 0
+    try:
+      while True:
+        month += 1
+        if month > 1 and (month - 1) % model.reset == 0:
+          index = model.step(rng, index)
+          changed = False
+          for loan in loans:
+            rate = max(base[loan.title] + Loan.Dec(index) / 100, 0)
+            if loan.title in variable and loan.int_rate != rate:
+              loan.int_rate = rate
+              changed = True
+          if changed and strategy.ordering == ORDER_ONCE:
+            loans.sort(key=strategy.key, reverse=strategy.reverse)
+        loans = next(months)
+    except StopIteration as done:
+      return done.value.get_analysis()
+
+  def test_matches_debt_solve(self):
+    model = RandomWalk(sigma=0.5, drift=0.05, reset=3)
+    for minimum in ('int', 'min'):
+      result = self.loan_queue.simulate(model, paths=4, strategies=['avalanche', 'cascade', 'snowball'], minimum=minimum,
+                                        variable=['2013', '2011'], seed=7)
+      for key in ('avalanche', 'cascade', 'snowball'):
+        for path in range(4):
+          analysis = self.reference(model, key, minimum, {'2013', '2011'}, 7, path)
+          self.assertEqual(result.interest[key][path], analysis["interest_paid"])
+          self.assertEqual(result.duration[key][path], analysis["duration"])
+
+  def test_rates_reorder(self):
+    # A variable loan rising past a fixed one becomes the avalanche
+    # target, as the same path as timeline rate changes
+    loans = [Loan(3000, 3, title="var", term=60), Loan(3000, 6, title="fixed", term=60)]
+    queue = LoanQueue(loans, 200)
+    result = queue.simulate(RandomWalk(sigma=0, drift=1), paths=1, strategies=['avalanche'], variable='var')
+    timeline = queue.branch()
+    timeline.timeline = Timeline([RateChange(m, 3 + (m - 1), "var") for m in range(2, 100)])
+    expected = timeline.debt_solve('avalanche', 'int')
+    self.assertEqual(result.interest["avalanche"], [expected.get_interest_paid()])
+    self.assertEqual(result.duration["avalanche"], [expected.get_duration()])
+    # Positions and single titles pick the same loans as lists of titles
+    self.assertEqual(queue.simulate(RandomWalk(sigma=0, drift=1), paths=1, variable=0).interest,
+                     queue.simulate(RandomWalk(sigma=0, drift=1), paths=1, variable=['var']).interest)
+
+  def test_reproducible(self):
+    model = MeanReverting(sigma=0.3, speed=0.2, mean=1)
+    first = self.loan_queue.simulate(model, paths=50, seed=3, chunksize=50)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+      again = self.loan_queue.simulate(model, paths=50, seed=3, chunksize=7, executor=pool)
+    self.assertEqual(first.interest, again.interest)
+    self.assertEqual(first.duration, again.duration)
+    other = self.loan_queue.simulate(model, paths=50, seed=4)
+    self.assertNotEqual(first.interest, other.interest)
+
+  def test_summary(self):
+    fixed = self.loan_queue.simulate(RandomWalk(sigma=0), paths=5, strategies=['avalanche'])
+    summary = fixed.summary()["avalanche"]
+    interest = float(self.loan_queue.debt_solve('avalanche', 'int').get_interest_paid())
+    self.assertEqual(summary["failures"], 0)
+    self.assertEqual(summary["interest_paid"]["p50"], interest)
+    self.assertEqual(summary["interest_paid"]["stdev"], 0)
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from itertools import product
+from financetools import Loan, LoanQueue
+from financetools.amortization import interest_due, step
+from financetools.batch import PortfolioBatch
+
+# Least interest over every way to split each month's remainder on a
+# grid of cents (the last active loan takes what's left)
+def brute_force(bal, rate, budget, grid):
+  best = [None]
+  def go(bal, paid, months):
+    active = [j for j in range(len(bal)) if bal[j]]
+    if not active:
+      if best[0] is None or paid < best[0]:
+        best[0] = paid
+      return
+    pays = {j: interest_due(bal[j], rate[j]) for j in active}
+    remainder = budget - sum(pays.values())
+    for extras in product(range(0, remainder + 1, grid), repeat=len(active) - 1):
+      if sum(extras) > remainder:
+        continue
+      split = dict(zip(active, extras + (remainder - sum(extras),)))
+      nxt, interest = list(bal), paid
+      for j in active:
+        nxt[j], p, i = step(bal[j], rate[j], pays[j] + split[j])
+        interest += i
+      go(nxt, interest, months + 1)
+  go(bal, 0, 0)
+  return best[0]
+
+class OptimalTest(unittest.TestCase):
+  def setUp(self):
+    self.loan_queue = LoanQueue([
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ], 750, title="Test Loans")
+
+  def test_against_brute_force(self):
+    for bal, rate, budget in [([30000, 45000], [2400, 600], 20000),
+                              ([12000, 20000, 9000], [1800, 900, 2700], 15000)]:
+      loans = [Loan(b / 100, r / 100, title=str(j)) for j, (b, r) in enumerate(zip(bal, rate))]
+      optimal = LoanQueue(loans, budget / 100).optimal()
+      best = brute_force(bal, rate, budget, 2500)
+      # The grid can't land on the exact spillover, never beat it
+      self.assertLessEqual(optimal.get_interest_paid(), Loan.Dec(best / 100))
+
+  def test_beats_heuristics(self):
+    for minimum in ['int', 'min']:
+      compare = self.loan_queue.finish('interest', minimum, optimal=True)
+      self.assertEqual(len(compare.grid), 6)
+      optimal = self.loan_queue.optimal(minimum)
+      self.assertEqual(compare.top().get_interest_paid(), optimal.get_interest_paid())
+      self.assertTrue(optimal.is_complete())
+
+  def test_batch(self):
+    batch = PortfolioBatch.from_queues([self.loan_queue])
+    for minimum in ['int', 'min', 'avg']:
+      self.assertEqual(batch.solve('optimal', minimum), [self.loan_queue.optimal(minimum).get_analysis()])
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import random
+from financetools import Loan, LoanQueue
+from financetools.scheduler import ActiveLoans
+
+class ActiveLoansTest(unittest.TestCase):
+  def setUp(self):
+    self.loans = [
+      Loan(2406.65, 4.41, 250, title="2014", term=12),
+      Loan(1000, 6.80, 90, title="2015", term=12),
+      Loan(5000, 3.20, 200, title="2016", term=36),
+      Loan(1000, 6.80, 90, title="2017", term=12)
+    ]
+
+  def test_keeps_stable_key_order(self):
+    rng = random.Random(3)
+    loans = list(self.loans)
+    active = ActiveLoans(loans, lambda l: l.get_int_due())
+    loans.sort(key=active.key)
+    active._rekey()
+    while active.size:
+      for l in loans:
+        l.payment_amt = l.get_int_due() + rng.randint(0, 300)
+      done = active.pay_month()
+      self.assertEqual(sorted(loans, key=active.key), loans)
+      self.assertTrue(all(l.is_complete() for l in done))
+      active.retire(done)
+      self.assertTrue(all(not l.is_complete() for l in loans))
+
+  def test_retires_in_place(self):
+    loans = list(self.loans)
+    active = ActiveLoans(loans)
+    active.retire([self.loans[1], self.loans[3]])
+    self.assertEqual(loans, [self.loans[0], self.loans[2]])
+    self.assertIs(active.target, self.loans[2])
+    with self.assertRaises(ValueError):
+      active.retire([self.loans[1]])
+
+  def test_debt_solve_with_paid_loan(self):
+    paid = Loan(100, 5, 200, title="paid", term=12)
+    paid.payoff()
+    queue = LoanQueue(self.loans + [paid], budget=900)
+    for key in ("avalanche", "blizzard", "snowball", "cascade"):
+      result = queue.debt_solve(key, "int")
+      self.assertEqual(result.size, 5)
+      self.assertTrue(all(l.is_complete() for l in result.Q))
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,73 @@
+import io
+import json
+import os
+import pickle
+import tempfile
+import unittest
+from decimal import Decimal
+from financetools import Loan, LoanQueue
+from financetools.ledger import Ledger, MappedLedger
+from financetools.serialize import dump, dumps, load, loads, iter_json, write_json
+
+class SerializeTest(unittest.TestCase):
+  def setUp(self):
+    self.loans = [
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ]
+    self.loan_queue = LoanQueue(self.loans, 750, title="Test Loans")
+    self.compare = self.loan_queue.finish()
+
+  def test_round_trip(self):
+    loan = Loan(245000, 6.1, title="Mortgage", term=360, backend='cents')
+    loan.payment_amt = loan.min_payment
+    loan.payoff()
+    queue = self.loan_queue.avalanche()
+    for result in (loan, queue, self.compare):
+      again = loads(dumps(result))
+      self.assertIs(type(again), type(result))
+      self.assertEqual(again.to_json(), result.to_json())
+    self.assertEqual(loads(dumps(loan)).backend.name, 'cents')
+    self.assertEqual(loads(dumps(self.loan_queue)).budget, self.loan_queue.budget)
+
+  def test_mapped_file(self):
+    with tempfile.TemporaryDirectory() as tmp:
+      path = os.path.join(tmp, 'grid.ftb')
+      with open(path, 'wb') as f:
+        dump(self.compare, f)
+      grid = load(path)
+      self.assertEqual([q.get_analysis() for q in grid.grid], [q.get_analysis() for q in self.compare.grid])
+      loan = grid.top().Q[0]
+      self.assertIsInstance(loan.Payment_History, MappedLedger)
+      self.assertEqual(loan.get_interest_history(), self.compare.top().Q[0].get_interest_history())
+
+      # Writing copies the rows out of the file first
+      what_if = loan.fork(5)
+      what_if.payment_amt += 50
+      what_if.payoff()
+      self.assertIsInstance(loan.Payment_History, MappedLedger)
+      loan.pay_month()
+      self.assertIs(type(loan.Payment_History), Ledger)
+      self.assertEqual(pickle.loads(pickle.dumps(grid.grid[1])).to_json(), self.compare.grid[1].to_json())
+      del grid, loan, what_if
+
+  def test_not_results(self):
+    with self.assertRaises(ValueError):
+      loads(b'nope' + bytes(8))
+    with self.assertRaises(TypeError):
+      dumps([self.loan_queue])
+
+  def test_json(self):
+    text = ''.join(iter_json(self.compare))
+    self.assertEqual(json.loads(text, parse_float=Decimal), self.compare.to_json())
+    self.assertEqual(json.loads(text), json.loads(json.dumps(self.compare.to_json(), default=float)))
+    out = io.StringIO()
+    queue = self.loan_queue.snowball()
+    write_json({"queue": queue, "budget": Loan.Dec(750)}, out)
+    self.assertEqual(json.loads(out.getvalue(), parse_float=Decimal),
+                     {"queue": queue.to_json(), "budget": Decimal('750.00')})
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,72 @@
+import copy
+import pickle
+import unittest
+from financetools import Loan, LoanQueue
+from financetools.batch import PortfolioBatch
+from financetools.spec import LoanSpec, specs
+
+class LoanSpecTest(unittest.TestCase):
+  def setUp(self):
+    self.columns = dict(
+      balances=[3245.65, 12002.91, 2481.30, 5930.42, 245000],
+      rates=[4.41, 3.61, 6.1, 6.1, 6.1],
+      terms=[36, 120, 60, 120, 360],
+      titles=["2014", "2013", "2012", "2011", "Mortgage"]
+    )
+    self.offsets = [0, 4, 5]
+    self.budgets = [750, 1600]
+    self.queues = [
+      LoanQueue([
+        Loan(3245.65, 4.41, title="2014", term=36),
+        Loan(12002.91, 3.61, title="2013", term=120),
+        Loan(2481.30, 6.1, title="2012", term=60),
+        Loan(5930.42, 6.1, title="2011", term=120)
+      ], 750),
+      LoanQueue([Loan(245000, 6.1, title="Mortgage", term=360)], 1600)
+    ]
+
+  def test_spec_matches_loan(self):
+    spec = LoanSpec(1000.505, 4.1, 100, title="Car", term=24)
+    loan = Loan(1000.505, 4.1, 100, title="Car", term=24)
+    self.assertEqual(spec.state(), loan.state())
+    self.assertEqual((spec.start_balance, spec.int_rate, spec.payment_amt),
+                     (loan.start_balance, loan.int_rate, loan.payment_amt))
+    self.assertEqual(spec.to_loan().solve().to_json(), loan.solve().to_json())
+    self.assertEqual(LoanSpec(1000, 4.1).payment_amt, 0)
+    self.assertEqual(LoanSpec(1000, 4.1).term, 12)
+
+  def test_immutable(self):
+    spec = LoanSpec(1000, 4.1, title="Car")
+    with self.assertRaises(AttributeError):
+      spec.balance = 0
+    with self.assertRaises(AttributeError):
+      spec.note = "new"
+    self.assertEqual(pickle.loads(pickle.dumps(spec)), spec)
+    self.assertEqual(copy.deepcopy(spec), spec)
+
+  def test_specs(self):
+    built = specs(**self.columns)
+    self.assertEqual([s.state() for s in built], [l.state() for q in self.queues for l in q.Q])
+
+  def test_queue_accepts_specs(self):
+    queue = LoanQueue(specs(**self.columns)[:4], 750)
+    self.assertTrue(all(isinstance(l, Loan) for l in queue.Q))
+    queue.add_loan(LoanSpec(500, 5, title="Card"))
+    self.assertEqual(queue.Q[-1].title, "Card")
+    self.assertEqual(queue.state()[:2], ("My Queue", 75000))
+
+  def test_from_columns(self):
+    queues = LoanQueue.from_columns(offsets=self.offsets, budgets=self.budgets, **self.columns)
+    self.assertEqual([q.state() for q in queues], [q.state() for q in self.queues])
+    for built, queue in zip(queues, self.queues):
+      for key in ('avalanche', 'cascade'):
+        self.assertEqual(built.debt_solve(key, 'int').to_json(), queue.debt_solve(key, 'int').to_json())
+    with self.assertRaises(ValueError):
+      LoanQueue.from_columns(offsets=[0, 4], **self.columns)
+
+  def test_batch_from_specs(self):
+    batch = PortfolioBatch.from_specs(specs(**self.columns), self.offsets, self.budgets)
+    self.assertEqual(batch.solve('avalanche'), PortfolioBatch.from_queues(self.queues).solve('avalanche'))
+
+if __name__ == "__main__":
+  unittest.main()
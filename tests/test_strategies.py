@@ -0,0 +1,68 @@
+import unittest
+from financetools import Loan, LoanQueue
+from financetools.batch import PortfolioBatch
+from financetools.strategies import (ORDER_ONCE, REGISTRY, SpreadStrategy, TargetStrategy,
+                                     get_strategy, register_strategy)
+
+# Target the largest balance first
+class LargestFirst(TargetStrategy):
+  name = 'largest_first'
+  ordering = ORDER_ONCE
+
+  def cents_key(self, b, r):
+    return b
+
+# Same extra payment on every loan
+class EvenSplit(SpreadStrategy):
+  name = 'even_split'
+
+  def weights(self, idx, bal, rate):
+    return [1 for j in idx]
+
+class StrategyTest(unittest.TestCase):
+  def setUp(self):
+    self.loan_queue = LoanQueue([
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ], 750, title="Test Loans")
+    self.custom = [LargestFirst(), EvenSplit()]
+    for strategy in self.custom:
+      register_strategy(strategy)
+
+  def tearDown(self):
+    for strategy in self.custom:
+      del REGISTRY[strategy.name]
+
+  def test_builtins_registered(self):
+    for key in ['avalanche', 'cascade', 'blizzard', 'ice_slide', 'snowball']:
+      self.assertEqual(get_strategy(key).name, key)
+    with self.assertRaises(ValueError):
+      get_strategy('hurricane')
+    with self.assertRaises(ValueError):
+      register_strategy(LargestFirst())
+
+  def test_custom_strategies(self):
+    batch = PortfolioBatch.from_queues([self.loan_queue])
+    for strategy in self.custom:
+      for minimum in ['int', 'min', 'avg']:
+        result = self.loan_queue.debt_solve(strategy.name, minimum)
+        self.assertTrue(result.is_complete())
+        self.assertEqual(batch.solve(strategy.name, minimum), [result.get_analysis()])
+
+  def test_largest_first(self):
+    result = self.loan_queue.debt_solve('largest_first', 'int')
+    paid_first = min(result.Q, key=lambda l: l.pay_no)
+    self.assertEqual(paid_first.title, "2013")
+    self.assertEqual(self.loan_queue.debt_solve('largest_first', 'min', event_driven=True).to_json(),
+                     self.loan_queue.debt_solve('largest_first', 'min').to_json())
+
+  def test_even_split(self):
+    queue = LoanQueue([Loan(1000, 5, 0, title="A"), Loan(2000, 7, 0, title="B")], 100)
+    queue.set_all_payments('int')
+    queue.distribute('even_split', queue.budget - sum(l.payment_amt for l in queue.Q))
+    self.assertEqual([l.payment_amt for l in queue.Q], [Loan.Dec(46.25), Loan.Dec(53.75)])
+
+if __name__ == "__main__":
+  unittest.main()
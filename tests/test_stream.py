@@ -0,0 +1,77 @@
+import io
+import json
+import unittest
+import tracemalloc
+from decimal import Decimal
+from financetools import Loan, LoanQueue
+from financetools.stream import Totals, iter_csv, write_csv, write_jsonl
+
+class StreamTest(unittest.TestCase):
+  def setUp(self):
+    self.loan = Loan(2406.65, 4.41, 250, title="2014", term=12)
+    self.loan_queue = LoanQueue([
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ], 750, title="Test Loans")
+
+  def test_schedule_matches_ledger(self):
+    rows = list(self.loan.iter_schedule())
+    history = self.loan.solve().Payment_History
+    self.assertEqual([r.balance for r in rows], history['balance'])
+    self.assertEqual([r.interest for r in rows], history['interest'])
+    self.assertEqual([r.pay_no for r in rows], history['pay_no'])
+    self.assertEqual(self.loan.pay_no, 0)
+
+  def test_schedule_months(self):
+    self.assertEqual(len(list(self.loan.iter_schedule(3))), 4)
+    # Can't cover interest, nothing past the starting row
+    self.assertEqual(len(list(Loan(1000, 12, 5, title="Stuck").iter_schedule())), 1)
+
+  def test_months_match_debt_solve(self):
+    for key in ['avalanche', 'blizzard', 'ice_slide']:
+      solved = {l.title: l.Payment_History for l in self.loan_queue.debt_solve(key, 'int').Q}
+      seen = {title: 0 for title in solved}
+      for row in self.loan_queue.iter_months(key):
+        history = solved[row.title]
+        self.assertEqual(row.pay_no, seen[row.title])
+        self.assertEqual(row.balance, history['balance'][row.pay_no])
+        self.assertEqual(row.principal, history['principal'][row.pay_no])
+        seen[row.title] += 1
+      self.assertEqual(seen, {title: h.rows for title, h in solved.items()})
+
+  def test_totals(self):
+    expected = self.loan_queue.debt_solve('cascade', 'min').get_analysis()
+    analysis = Totals().consume(self.loan_queue.iter_months('cascade', 'min'))
+    self.assertEqual(analysis, {k: expected[k] for k in analysis})
+
+  def test_sinks(self):
+    out = io.StringIO()
+    totals = Totals()
+    write_csv(totals.track(self.loan.iter_schedule()), out)
+    lines = out.getvalue().splitlines()
+    self.assertEqual(lines[0], 'title,pay_no,balance,principal,interest')
+    self.assertEqual(lines[1], '2014,0,2406.65,0.00,0.00')
+    self.assertEqual(len(lines), totals.duration + 2)
+    self.assertEqual(list(iter_csv([])), ['title,pay_no,balance,principal,interest\n'])
+
+    out = io.StringIO()
+    write_jsonl(self.loan.iter_schedule(1), out)
+    rows = [json.loads(line, parse_float=Decimal) for line in out.getvalue().splitlines()]
+    self.assertEqual(rows[1], {"title": "2014", "pay_no": 1, "balance": Decimal('2165.49'),
+                               "principal": Decimal('241.16'), "interest": Decimal('8.84')})
+
+  def test_constant_memory(self):
+    loan = Loan(245000, 6.1, 1000, title="Mortgage", term=360)
+    def peak(months):
+      tracemalloc.start()
+      for row in loan.iter_schedule(months):
+        pass
+      size = tracemalloc.get_traced_memory()[1]
+      tracemalloc.stop()
+      return size
+    self.assertLess(peak(3000), peak(30) + 2048)
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from financetools import Loan, LoanQueue, SolveCache
+
+class SweepTest(unittest.TestCase):
+  def setUp(self):
+    self.loans = [
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ]
+    self.loan_queue = LoanQueue(self.loans, 750, title="Test Loans")
+
+  def test_matches_debt_solve(self):
+    table = self.loan_queue.sweep([300, 750, 2000], rate_shocks=[0, 1.5], minimum='min')
+    self.assertEqual(len(table), 3 * 2 * 5)
+    for budget, shock, strategy, *result in table:
+      loans = [Loan(l.start_balance, l.int_rate + shock, title=l.title, term=l.term) for l in self.loans]
+      try:
+        analysis = LoanQueue(loans, budget).debt_solve(strategy, 'min').get_analysis()
+      except ValueError:
+        self.assertEqual(result, [None] * 5)
+        continue
+      self.assertEqual(result, [analysis[k] for k in ("duration", "num_payments", "principal_paid",
+                                                      "interest_paid", "total_paid")])
+
+  def test_infeasible_and_stalled(self):
+    # Exactly the first month's interest leaves nothing to pay down
+    interest = sum(Loan.Dec(l.get_int_due()) for l in self.loans)
+    table = self.loan_queue.sweep([50, interest, 150], strategies=['avalanche'])
+    self.assertEqual(table.column('duration'), [None, None, 232])
+
+  def test_repeated_points(self):
+    cache = SolveCache()
+    table = self.loan_queue.sweep([800, 1200, 800.001, 800], strategies=['avalanche'], cache=cache)
+    self.assertEqual(cache.stats["misses"], 2)
+    rows = table.rows
+    self.assertEqual(rows[0], rows[2])
+    self.assertEqual(rows[0], rows[3])
+    self.assertNotEqual(rows[0][3:], rows[1][3:])
+
+  def test_best(self):
+    table = self.loan_queue.sweep([800, 1200])
+    best = table.best('interest')
+    self.assertEqual([row[0] for row in best], [Loan.Dec(800), Loan.Dec(1200)])
+    for row in best:
+      compare = LoanQueue(self.loans, row[0]).finish('interest')
+      self.assertEqual(row[6], compare.top().get_interest_paid())
+    self.assertEqual(list(table.to_json()), list(table.COLUMNS))
+
+  def test_cache_and_executor(self):
+    cache = SolveCache()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+      first = self.loan_queue.sweep(range(600, 1000, 100), executor=pool, cache=cache)
+    self.assertEqual(cache.stats["misses"], 20)
+    again = self.loan_queue.sweep(range(600, 1100, 100), cache=cache)
+    self.assertEqual(cache.stats["hits"], 20)
+    self.assertEqual(again.rows[:4], first.rows[:4])
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,104 @@
+import pickle
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from financetools import Loan, LoanQueue, SolveCache
+from financetools import instrument
+from financetools.loan_queue import STRATEGIES
+from financetools.timeline import Timeline, LumpSum, RateChange
+
+THREADS = 8
+
+class ThreadSafetyTest(unittest.TestCase):
+  def setUp(self):
+    # Switch threads as often as possible to shake out races
+    self.interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    self.loan_queue = LoanQueue([
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ], 500, title="Test Loans")
+
+  def tearDown(self):
+    sys.setswitchinterval(self.interval)
+
+  def run_threads(self, fn, n=THREADS):
+    with ThreadPoolExecutor(n) as executor:
+      return list(executor.map(lambda _: fn(), range(n)))
+
+  def test_shared_queue(self):
+    state = self.loan_queue.state()
+    expected = [self.loan_queue.debt_solve(key, 'int').to_json() for key in STRATEGIES]
+    def solve():
+      return [self.loan_queue.debt_solve(key, 'int', event_driven=True).to_json() for key in STRATEGIES]
+    for results in self.run_threads(solve):
+      self.assertEqual(results, expected)
+    self.assertEqual(self.loan_queue.state(), state)
+    self.assertTrue(all(l.pay_no == 0 for l in self.loan_queue.Q))
+
+  def test_finish_threads(self):
+    expected = [q.get_analysis() for q in self.loan_queue.finish('time').grid]
+    cache = SolveCache()
+    def finish():
+      return (self.loan_queue.finish('time', parallel='threads').grid,
+              self.loan_queue.finish('time', cache=cache).grid)
+    grids = self.run_threads(finish)
+    for threaded, cached in grids:
+      self.assertEqual([q.get_analysis() for q in threaded], expected)
+      self.assertEqual([q.get_analysis() for q in cached], expected)
+    # Every thread got the same cached objects
+    for _, cached in grids:
+      self.assertEqual([id(q) for q in cached], [id(q) for q in grids[0][1]])
+
+  def test_counters(self):
+    instances, untitled = Loan.INSTANCE_COUNTER, Loan.UNTITLED_COUNTER
+    loans = self.run_threads(lambda: [Loan(1000, 5) for _ in range(200)])
+    titles = [l.title for batch in loans for l in batch]
+    self.assertEqual(len(set(titles)), THREADS * 200)
+    self.assertEqual(Loan.INSTANCE_COUNTER - instances, THREADS * 200)
+    self.assertEqual(Loan.UNTITLED_COUNTER - untitled, THREADS * 200)
+
+  def test_metrics(self):
+    with instrument.measure() as metrics:
+      def count():
+        for _ in range(1000):
+          metrics.count('stress')
+        self.loan_queue.debt_solve('avalanche', 'int')
+      self.run_threads(count)
+    self.assertEqual(metrics.counters['stress'], THREADS * 1000)
+    self.assertEqual(metrics.counters['debt_solve.avalanche'], THREADS)
+    months = self.loan_queue.debt_solve('avalanche', 'int').get_duration()
+    self.assertEqual(metrics.counters['months'], THREADS * months)
+
+  def test_deferred_ledger(self):
+    def solved():
+      loan = Loan(245000, 6.1, 1600, title="Mortgage", term=360)
+      loan.timeline = Timeline([LumpSum(24, 5000), RateChange(60, 5.5)])
+      return loan.payoff()
+    expected = solved().to_json()
+    shared = solved()
+    barrier = threading.Barrier(THREADS)
+    def read():
+      barrier.wait()
+      return shared.to_json()
+    for result in self.run_threads(read):
+      self.assertEqual(result, expected)
+
+  def test_ledger_locks(self):
+    # A ledger mid-replay doesn't hold up reads of any other
+    loan = Loan(245000, 6.1, 1600, title="Mortgage", term=360)
+    loan.timeline = Timeline([LumpSum(24, 5000)])
+    busy, other = loan.payoff().Payment_History, loan.solve().Payment_History
+    with busy._lock:
+      with ThreadPoolExecutor(1) as executor:
+        self.assertEqual(executor.submit(other.column, 'balance').result(timeout=5)[-1], 0)
+    # Copies get a lock of their own
+    copy = pickle.loads(pickle.dumps(busy))
+    self.assertIsNot(copy._lock, busy._lock)
+    self.assertEqual(copy.to_json(), busy.to_json())
+
+if __name__ == "__main__":
+  unittest.main()
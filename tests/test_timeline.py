@@ -0,0 +1,142 @@
+import unittest
+from financetools import Loan, LoanQueue
+from financetools.strategies import ORDER_EVERY, get_strategy
+from financetools.timeline import Timeline, LumpSum, RateChange, BudgetChange
+
+class TimelineTest(unittest.TestCase):
+  def setUp(self):
+    self.loans = [
+      Loan(3245.65, 4.41, title="2014", term=36),
+      Loan(12002.91, 3.61, title="2013", term=120),
+      Loan(2481.30, 6.1, title="2012", term=60),
+      Loan(5930.42, 6.1, title="2011", term=120)
+    ]
+    self.loan_queue = LoanQueue(self.loans, 500, title="Test Loans")
+    self.events = [
+      LumpSum(3, 2000),
+      RateChange(6, 7.25, "2013"),
+      LumpSum(6, 300, "2012"),
+      BudgetChange(12, 400),
+      RateChange(20, 2.5),
+      LumpSum(24, 1000, "2014")
+    ]
+
+  # debt_solve the slow way, changing the queue by hand every month
+  def reference(self, key, minimum):
+    strategy = get_strategy(key)
+    queue = self.loan_queue.branch()
+    queue.prioritize(strategy)
+    completed, month = [], 0
+    while queue.Q:
+      month += 1
+      extra, targeted = 0, []
+      for event in self.events:
+        if event.month != month:
+          continue
+        if isinstance(event, BudgetChange):
+          queue.budget = event.budget
+        elif isinstance(event, RateChange):
+          for loan in queue.Q:
+            if event.loan in (None, loan.title):
+              loan.int_rate = event.rate
+          queue.prioritize(strategy)
+        elif event.loan in [l.title for l in queue.Q]:
+          targeted.append((next(l for l in queue.Q if l.title == event.loan), event.amount))
+        else:
+          extra += Loan.Dec(event.amount)
+      if strategy.ordering == ORDER_EVERY:
+        queue.prioritize(strategy)
+      strategy.distribute(queue.Q, queue.set_all_payments(minimum) + extra)
+      for loan, amount in targeted:
+        loan.payment_amt += Loan.Dec(amount)
+      for loan in list(queue.Q):
+        loan.pay_month()
+        if loan.is_complete():
+          queue.Q.remove(loan)
+          completed.append(loan)
+    return LoanQueue(completed, self.loan_queue.budget).get_analysis()
+
+  def test_queue_matches_reference(self):
+    self.loan_queue.timeline = Timeline(self.events)
+    for key in ('avalanche', 'blizzard', 'snowball', 'cascade', 'ice_slide', 'optimal'):
+      for minimum in ('int', 'min'):
+        expected = self.reference(key, minimum)
+        self.assertEqual(self.loan_queue.debt_solve(key, minimum).get_analysis(), expected)
+        self.assertEqual(self.loan_queue.debt_solve(key, minimum, event_driven=True).get_analysis(), expected)
+        self.assertEqual(self.loan_queue.debt_solve(key, minimum, event_driven=True).to_json(),
+                         self.loan_queue.debt_solve(key, minimum).to_json())
+
+  def test_loan_payoff(self):
+    loan = Loan(245000, 6.1, 1500, title="Mortgage", term=360)
+    events = [LumpSum(12, 20000), RateChange(60, 5.25), BudgetChange(61, 2000), LumpSum(61, 500)]
+    expected = loan.branch()
+    for month in range(1, 1000):
+      if expected.is_complete():
+        break
+      if month == 60:
+        expected.int_rate = 5.25
+      if month == 61:
+        expected.payment_amt = 2000
+      lump = {12: 20000, 61: 500}.get(month, 0)
+      expected.payment_amt += lump
+      expected.pay_month()
+      expected.payment_amt -= lump
+    loan.timeline = Timeline(events)
+    solved = loan.solve()
+    self.assertEqual(solved.to_json(), expected.to_json())
+    self.assertEqual(loan.solve_schedule().to_json(), expected.to_json())
+    rows = list(loan.iter_schedule())
+    self.assertEqual(sum(r.interest for r in rows), expected.get_interest_paid())
+    self.assertEqual([r.balance for r in rows], expected.Payment_History['balance'])
+    self.assertIsNone(Loan(245000, 6.1, 1500).timeline)
+
+  def test_loan_solves(self):
+    loan = Loan(10000, 6, 500, title="Lump")
+    loan.timeline = Timeline([LumpSum(3, 5000)])
+    self.assertEqual(loan.solve().pay_no, 11)
+    self.assertEqual(len(list(loan.iter_schedule())), 12)
+    self.assertEqual(len(list(loan.iter_schedule(5))), 6)
+    # A rate rise that leaves the payment short stops the stream
+    stuck = Loan(10000, 6, 60, title="Stuck")
+    stuck.timeline = Timeline([RateChange(4, 9)])
+    self.assertEqual(len(list(stuck.iter_schedule())), 4)
+    for solve in (loan.solve_closed_form, loan.recursive_solve, lambda: loan.solve_schedule(exact=False),
+                  lambda: loan.payment_for_term(12)):
+      with self.assertRaises(ValueError):
+        solve()
+
+  def test_fork_reads_on(self):
+    # Forks pick the timeline up where they branch off, events already
+    # paid aren't paid again
+    loan = Loan(10000, 6, 500, title="Lump")
+    loan.timeline = Timeline([LumpSum(3, 5000), RateChange(4, 9), BudgetChange(7, 700), LumpSum(9, 100)])
+    solved = loan.solve()
+    for k in range(solved.pay_no + 1):
+      with self.subTest(at=k):
+        self.assertEqual(solved.fork(k).payoff().get_analysis(), solved.get_analysis())
+        streamed = sum(row.interest for row in solved.fork(k).iter_schedule())
+        self.assertEqual(solved.fork(k).get_interest_paid() + streamed, solved.get_interest_paid())
+
+  def test_fork_keeps_timeline(self):
+    self.loan_queue.timeline = Timeline(self.events)
+    self.assertIs(self.loan_queue.fork().timeline, self.loan_queue.timeline)
+
+  def test_cache_key(self):
+    plain = self.loan_queue.state()
+    self.loan_queue.timeline = Timeline([BudgetChange(12, 400)])
+    self.assertNotEqual(self.loan_queue.state(), plain)
+    self.assertEqual(self.loan_queue.branch().state(), self.loan_queue.state())
+
+  def test_events(self):
+    timeline = Timeline([BudgetChange(12, 400), LumpSum(3, 1000), LumpSum(12, 5)])
+    self.assertEqual([e.month for e in timeline], [3, 12, 12])
+    self.assertEqual(timeline.at(12), [BudgetChange(12, Loan.Dec(400)), LumpSum(12, Loan.Dec(5))])
+    self.assertEqual(timeline.next_after(3), 12)
+    self.assertEqual(timeline.next_after(12), float('inf'))
+    with self.assertRaises(ValueError):
+      timeline.add(LumpSum(0, 10))
+    with self.assertRaises(TypeError):
+      timeline.add((3, 10))
+
+if __name__ == "__main__":
+  unittest.main()